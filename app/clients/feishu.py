@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional
 from urllib.parse import quote
 
 import lark_oapi as lark
+import orjson
 from lark_oapi.api.sheets.v3 import (
 	QuerySpreadsheetSheetRequest,
 	QuerySpreadsheetSheetResponse,
@@ -72,7 +73,7 @@ class FeishuClient:
 				f"client.drive.v1.file.list failed, code: {response.code}, msg: {response.msg}, "
 				f"log_id: {response.get_log_id()}, resp: \n{json.dumps(json.loads(response.raw.content), indent=4, ensure_ascii=False)}"
 			)
-			raise RuntimeError(f"Drive list failed: {response.code} {response.msg}")
+			raise RuntimeError(f"Drive list failed: code={response.code}, msg={response.msg}")
 
 		return response.data if response.data is not None else {}
 
@@ -91,7 +92,7 @@ class FeishuClient:
 				f"client.sheets.v3.spreadsheet_sheet.query failed, code: {response.code}, msg: {response.msg}, "
 				f"log_id: {response.get_log_id()}, resp: \n{json.dumps(json.loads(response.raw.content), indent=4, ensure_ascii=False)}"
 			)
-			raise RuntimeError(f"Sheets query failed: {response.code} {response.msg}")
+			raise RuntimeError(f"Sheets query failed: code={response.code}, msg={response.msg}")
 		try:
 			self._logger.info(lark.JSON.marshal(response.data, indent=4))
 		except Exception:
@@ -114,7 +115,7 @@ class FeishuClient:
 				f"client.drive.v1.file.get failed, code: {response.code}, msg: {response.msg}, "
 				f"log_id: {response.get_log_id()}, resp: \n{json.dumps(json.loads(response.raw.content), indent=4, ensure_ascii=False)}"
 			)
-			raise RuntimeError(f"Drive get failed: {response.code} {response.msg}")
+			raise RuntimeError(f"Drive get failed: code={response.code}, msg={response.msg}")
 		return response.data if response.data is not None else {}
 
 	# ---------- Sheets v2：读取指定范围的值（使用 lark 原生 BaseRequest 调用） ----------
@@ -156,8 +157,11 @@ class FeishuClient:
 			)
 
 		try:
-			body = json.loads(response.raw.content.decode("utf-8"))
-			self._logger.debug(f"解析响应体成功，数据结构: {json.dumps(body, indent=2, ensure_ascii=False)}")
+			# orjson 直接解析 bytes，避免 decode 与纯 Python 解析开销（大表 values 可达百万单元格）
+			body = orjson.loads(response.raw.content)
+			if self._logger.isEnabledFor(logging.DEBUG):
+				# 大表响应体可达百万单元格，调试输出同样使用 orjson 格式化
+				self._logger.debug(f"解析响应体成功，数据结构: {orjson.dumps(body, option=orjson.OPT_INDENT_2).decode()}")
 		except Exception as ex:
 			self._logger.error(f"解析响应体失败: {ex}, 原始内容: {response.raw.content}")
 			raise RuntimeError(f"invalid json body: {ex}")
@@ -28,6 +28,9 @@ class FeishuSettings(BaseModel):
 	- XPJ_FEISHU__AUTH__TENANT_KEY
 	- XPJ_FEISHU__BASE_URL
 	- XPJ_FEISHU__TIMEOUT_SECONDS
+	- XPJ_FEISHU__SHEET_CONCURRENCY
+	- XPJ_FEISHU__SHEET_READ_ROWS
+	- XPJ_FEISHU__DRIVE_CONCURRENCY
 	"""
 
 	auth: FeishuAuthSettings = Field(default_factory=FeishuAuthSettings)
@@ -37,12 +40,22 @@ class FeishuSettings(BaseModel):
 	timeout_seconds: int = Field(
 		default=10, ge=1, le=120, description="HTTP 请求超时时间（秒）"
 	)
+	sheet_concurrency: int = Field(
+		default=8, ge=1, le=64, description="Sheet 读取线程池大小（同步 SDK 调用并发上限）"
+	)
+	drive_concurrency: int = Field(
+		default=4, ge=1, le=32, description="Drive 列表线程池大小（同步 SDK 调用并发上限）"
+	)
+	sheet_read_rows: int = Field(
+		default=5000, ge=10, le=5000, description="同步时单次读取的行数（分块读取与写入）"
+	)
 
 
 class RedisSettings(BaseModel):
 	"""Redis 基础配置。优先使用 `url`，否则拼装分段配置。支持：
 	- XPJ_REDIS__URL
 	- XPJ_REDIS__HOST / PORT / DB / USERNAME / PASSWORD / SSL
+	- XPJ_REDIS__WRITE_BATCH_SIZE
 	"""
 
 	url: Optional[str] = Field(default=None, description="Redis 连接 URL，优先使用")
@@ -52,6 +65,9 @@ class RedisSettings(BaseModel):
 	username: Optional[str] = Field(default=None, description="用户名，可选")
 	password: Optional[str] = Field(default=None, description="密码，可选")
 	ssl: bool = Field(default=False, description="是否启用 SSL")
+	write_batch_size: int = Field(
+		default=1000, ge=1, le=100000, description="批量写入时单个 pipeline 的行数"
+	)
 
 	@property
 	def dsn(self) -> str:
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from app.clients.feishu import FeishuClient
+from app.services.feishu import DriveService, SheetService
 
 from app.core.config import settings
 from app.api.v1.router import api_v1_router
@@ -17,3 +18,6 @@ def read_root():
 @app.on_event("startup")
 def startup() -> None:
 	app.state.feishu = FeishuClient()
+	# Drive/Sheet 服务为无状态封装，随应用生命周期单例化
+	app.state.drive_service = DriveService(app.state.feishu)
+	app.state.sheet_service = SheetService(app.state.feishu)
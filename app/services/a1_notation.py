@@ -0,0 +1,38 @@
+"""
+A1 表示法工具（Sheet 服务的范围校验与 Schema 的范围解析共用）
+"""
+from typing import List, Optional, Tuple
+import re
+
+
+# 单元格范围：列字母 + 行数字 [+ : + 列字母 + 行数字]（split_a1 的正则等价形式）
+A1_RANGE_RE = re.compile(r'^([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$')
+
+
+def split_a1(body: str) -> Optional[Tuple[str, str, Optional[str], Optional[str]]]:
+    """逐字符拆分 `[A-Z]+[0-9]+(:[A-Z]+[0-9]+)?`，返回与 A1_RANGE_RE 相同的四元组；不匹配返回 None。"""
+    n = len(body)
+    parts: List[str] = []
+    i = 0
+    while True:
+        start = i
+        while i < n and "A" <= body[i] <= "Z":
+            i += 1
+        if i == start:
+            return None
+        parts.append(body[start:i])
+        start = i
+        while i < n and "0" <= body[i] <= "9":
+            i += 1
+        if i == start:
+            return None
+        parts.append(body[start:i])
+        if i == n:
+            break
+        if len(parts) == 2 and body[i] == ":":
+            i += 1
+            continue
+        return None
+    if len(parts) == 2:
+        return parts[0], parts[1], None, None
+    return parts[0], parts[1], parts[2], parts[3]
@@ -2,11 +2,16 @@
 基础服务类 - 提供通用功能如日志、错误处理、度量等
 """
 import logging
+import re
 from abc import ABC
 from typing import Any, Dict, Optional
 from datetime import datetime
 
 
+# 从飞书 SDK 错误信息中提取 code=<错误码>（至逗号或空白为止），各飞书服务共用
+FEISHU_ERROR_CODE_RE = re.compile(r"code=([^,\s]+)")
+
+
 class BaseService(ABC):
     """所有服务的基类"""
     
@@ -22,21 +27,21 @@ class BaseService(ABC):
         self._metrics: Dict[str, Any] = {}
         self._start_time = datetime.now()
     
-    def log_info(self, message: str, **kwargs) -> None:
-        """记录信息日志"""
-        self.logger.info(message, extra=kwargs)
+    def log_info(self, message: str, *args: Any, **kwargs) -> None:
+        """记录信息日志（支持 %-格式参数，仅在实际输出时格式化）"""
+        self.logger.info(message, *args, extra=kwargs)
     
     def log_error(self, message: str, error: Optional[Exception] = None, **kwargs) -> None:
         """记录错误日志"""
         self.logger.error(message, exc_info=error, extra=kwargs)
     
-    def log_debug(self, message: str, **kwargs) -> None:
-        """记录调试日志"""
-        self.logger.debug(message, extra=kwargs)
+    def log_debug(self, message: str, *args: Any, **kwargs) -> None:
+        """记录调试日志（支持 %-格式参数，仅在实际输出时格式化）"""
+        self.logger.debug(message, *args, extra=kwargs)
     
-    def log_warning(self, message: str, **kwargs) -> None:
-        """记录警告日志"""
-        self.logger.warning(message, extra=kwargs)
+    def log_warning(self, message: str, *args: Any, **kwargs) -> None:
+        """记录警告日志（支持 %-格式参数，仅在实际输出时格式化）"""
+        self.logger.warning(message, *args, extra=kwargs)
     
     def record_metric(self, metric_name: str, value: Any) -> None:
         """
@@ -2,6 +2,7 @@
 缓存键生成规则
 """
 import hashlib
+from functools import lru_cache
 from typing import Optional
 
 
@@ -10,6 +11,8 @@ class CacheKeys:
     
     # 键前缀
     PREFIX = "xpj"
+    # 注：表级/分组级键（ids/gids/gcount）在批量写入时高度重复，对应方法带 lru_cache；
+    # 行级键（cfgid/gstate）每行唯一，不做缓存。
     
     # 键模板
     STRUCTURED_DATA = "{prefix}:sheet:structured:{sheet_token}:{sheet_name}:{range_hash}"
@@ -142,11 +145,13 @@ class CacheKeys:
         return cls.TABLE_SCHEMA.format(prefix=cls.PREFIX, table=table)
 
     @classmethod
+    @lru_cache(maxsize=4096)
     def table_ids_key(cls, table: str) -> str:
         """表内有序 ID 集合键"""
         return cls.TABLE_IDS.format(prefix=cls.PREFIX, table=table)
     
     @classmethod
+    @lru_cache(maxsize=4096)
     def table_group_ids_key(cls, table: str, group: str, value: str) -> str:
         """分组值对应的 ID 有序集合键"""
         return cls.TABLE_GROUP_IDS.format(
@@ -154,6 +159,7 @@ class CacheKeys:
         )
 
     @classmethod
+    @lru_cache(maxsize=4096)
     def table_group_count_key(cls, table: str, group: str) -> str:
         """分组计数哈希键（field=value, value=count）"""
         return cls.TABLE_GROUP_COUNT.format(
@@ -168,6 +174,7 @@ class CacheKeys:
         )
 
     @classmethod
+    @lru_cache(maxsize=4096)
     def table_tgroup_ids_key(cls, table: str, group_value: str) -> str:
         """表级组名对应的 ID 集合键（不含字段名维度）。"""
         return cls.TABLE_TGROUP_IDS.format(
@@ -1,15 +1,22 @@
 """
 Redis 缓存服务
 """
-from typing import Any, Optional, Callable, Awaitable
-import json
+from typing import Any, Dict, Optional, Callable, Awaitable
 import asyncio
+import json
+import re
 from contextlib import asynccontextmanager
+import orjson
 import redis.asyncio as redis
 from app.services.base import BaseService, CacheError
 from app.core.config import settings
 
 
+# 可能超出 64 位整数范围的数字串（orjson 无法精确往返）
+_LONG_DIGITS_RE = re.compile(r"\d{20}")
+_LONG_DIGITS_BYTES_RE = re.compile(rb"\d{20}")
+
+
 class RedisService(BaseService):
     """Redis 缓存服务封装"""
     
@@ -160,6 +167,48 @@ class RedisService(BaseService):
                 details={"key": key}
             )
     
+    async def mset(
+        self,
+        mapping: Dict[str, Any],
+        ttl: Optional[int] = None
+    ) -> bool:
+        """
+        批量设置多个键的值
+        
+        无 TTL 时使用单条 MSET；有 TTL 时退化为 pipeline 中的逐键 SETEX。
+        
+        Args:
+            mapping: {键: 值}
+            ttl: 过期时间（秒）
+            
+        Returns:
+            是否设置成功
+        """
+        if not mapping:
+            return True
+        
+        try:
+            client = await self._ensure_connected()
+            serialize = self._serialize
+            if ttl:
+                async with client.pipeline(transaction=False) as pipe:
+                    for key, value in mapping.items():
+                        pipe.setex(key, ttl, serialize(value))
+                    result = all(await pipe.execute())
+            else:
+                result = await client.mset({key: serialize(value) for key, value in mapping.items()})
+            
+            self.log_debug(f"批量设置缓存: {len(mapping)} 个键, TTL={ttl}")
+            return bool(result)
+            
+        except Exception as e:
+            self.log_error("批量设置缓存失败", error=e)
+            raise CacheError(
+                f"批量设置缓存失败: {str(e)}",
+                code="CACHE_MSET_ERROR",
+                details={"keys": list(mapping)}
+            )
+    
     async def delete(self, key: str) -> bool:
         """
         删除缓存
@@ -304,13 +353,25 @@ class RedisService(BaseService):
             self.redis_client = None
             self.log_info("Redis 连接已关闭")
     
-    def _serialize(self, value: Any) -> str:
-        """序列化数据"""
-        return json.dumps(value, ensure_ascii=False, default=str)
+    def _serialize(self, value: Any) -> bytes:
+        """序列化数据（orjson，直接输出 UTF-8 bytes）
+
+        orjson 不支持超出 64 位的整数（如超长 ID 单元格），此时回退标准库 json。
+        """
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return json.dumps(value, ensure_ascii=False, default=str).encode()
     
-    def _deserialize(self, data: str) -> Any:
-        """反序列化数据"""
-        return json.loads(data)
+    def _deserialize(self, data: str | bytes) -> Any:
+        """反序列化数据
+
+        orjson 会把超出 64 位的整数解析为 float 而丢失精度；含 20 位以上连续数字时改用标准库 json。
+        """
+        pattern = _LONG_DIGITS_RE if isinstance(data, str) else _LONG_DIGITS_BYTES_RE
+        if pattern.search(data) is not None:
+            return json.loads(data)
+        return orjson.loads(data)
     
     @asynccontextmanager
     async def pipeline(self):
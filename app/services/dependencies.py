@@ -61,14 +61,14 @@ def get_merger() -> SheetMerger:
     return _merger
 
 
-def get_drive_service(feishu_client: Annotated[FeishuClient, Depends(get_feishu_client)]) -> DriveService:
-    """获取 Drive 服务"""
-    return DriveService(feishu_client)
+def get_drive_service(request: Request) -> DriveService:
+    """获取 Drive 服务（应用启动时创建的单例）"""
+    return request.app.state.drive_service
 
 
-def get_sheet_service(feishu_client: Annotated[FeishuClient, Depends(get_feishu_client)]) -> SheetService:
-    """获取 Sheet 服务"""
-    return SheetService(feishu_client)
+def get_sheet_service(request: Request) -> SheetService:
+    """获取 Sheet 服务（应用启动时创建的单例）"""
+    return request.app.state.sheet_service
 
 
 # 结构化服务已下线：相关依赖与路由已移除
@@ -3,12 +3,25 @@
 """
 from typing import List, Optional, Dict, Any
 import asyncio
-from datetime import datetime
-from app.services.base import BaseService, FeishuAPIError
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.services.base import BaseService, FeishuAPIError, FEISHU_ERROR_CODE_RE
 from app.clients.feishu import FeishuClient
+from app.core.config import settings
 from .models import FileInfo, DriveListResponse
 
 
+# 飞书 SDK 为同步调用，派发到 Drive 专用线程池，避免阻塞事件循环
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.feishu.drive_concurrency,
+    thread_name_prefix="feishu-drive",
+)
+
+
+# 异常对象上可能携带错误码的属性（按优先级）
+_CODE_ATTRS = ("code", "error_code", "resp_code")
+
+
 class DriveService(BaseService):
     """飞书 Drive 服务，负责获取文件夹内容"""
     
@@ -25,14 +38,14 @@ class DriveService(BaseService):
     async def list_all_files(
         self, 
         folder_token: str,
-        page_size: int = 50
+        page_size: int = 200
     ) -> List[FileInfo]:
         """
         获取指定文件夹下的所有文件（支持分页）
         
         Args:
             folder_token: 文件夹 token
-            page_size: 每页大小
+            page_size: 每页大小（默认取 Drive file.list 允许的最大值 200，减少分页往返）
             
         Returns:
             文件信息列表
@@ -40,16 +53,19 @@ class DriveService(BaseService):
         Raises:
             FeishuAPIError: 飞书 API 调用失败
         """
-        self.log_info(f"开始获取文件夹 {folder_token} 下的所有文件")
+        self.log_info("开始获取文件夹 %s 下的所有文件", folder_token)
         
         all_files: List[FileInfo] = []
         page_token: Optional[str] = None
         page_count = 0
         
+        loop = asyncio.get_running_loop()
         while True:
             try:
-                # 直接调用 FeishuClient（同步调用）
-                response_data = self.feishu_client.list_drive_files(
+                # FeishuClient 为同步调用，在专用线程池中执行
+                response_data = await loop.run_in_executor(
+                    _EXECUTOR,
+                    self.feishu_client.list_drive_files,
                     folder_token,
                     page_size,
                     page_token
@@ -60,7 +76,8 @@ class DriveService(BaseService):
                 all_files.extend(response.files)
                 
                 page_count += 1
-                self.log_debug(f"获取第 {page_count} 页，文件数: {len(response.files)}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.log_debug("获取第 %d 页，文件数: %d", page_count, len(response.files))
                 
                 # 检查是否有更多页
                 if not response.has_more or not response.next_page_token:
@@ -74,7 +91,7 @@ class DriveService(BaseService):
             except Exception as e:
                 self._handle_api_error(e)
         
-        self.log_info(f"共获取 {len(all_files)} 个文件，分 {page_count} 页")
+        self.log_info("共获取 %d 个文件，分 %d 页", len(all_files), page_count)
         self.record_metric("files_fetched", len(all_files))
         self.record_metric("pages_fetched", page_count)
         
@@ -128,21 +145,26 @@ class DriveService(BaseService):
         """处理飞书 API 错误"""
         error_msg = str(error)
         
-        # 尝试从异常中提取错误码
+        # 优先读取异常上的结构化错误码，其次从错误信息中提取
         error_code = "UNKNOWN"
-        if hasattr(error, 'code'):
-            error_code = str(error.code)
-        elif "code=" in error_msg:
-            # 从错误信息中提取
-            try:
-                error_code = error_msg.split("code=")[1].split(",")[0]
-            except:
-                pass
+        for attr in _CODE_ATTRS:
+            value = getattr(error, attr, None)
+            if value is not None:
+                error_code = str(value)
+                break
+        else:
+            m = FEISHU_ERROR_CODE_RE.search(error_msg)
+            if m:
+                error_code = m.group(1)
         
         self.log_error(f"飞书 API 错误: {error_code} - {error_msg}")
         
         raise FeishuAPIError(
             message=f"飞书 API 调用失败: {error_msg}",
             code=error_code,
-            details={"error_msg": error_msg}
+            details={
+                "error_msg": error_msg,
+                # 数字错误码便于上层重试/退避逻辑区分限流与服务端错误
+                "feishu_code": int(error_code) if error_code.isdigit() else None,
+            }
         )
@@ -6,15 +6,50 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 
-@dataclass
+# 快捷方式目标 token 前缀 -> 文件类型
+_SHORTCUT_PREFIX_TYPES: Dict[str, str] = {
+    "sht": "sheet",
+    "dox": "docx",
+    "box": "file",
+}
+
+
+# 不小于该值的时间戳按毫秒处理（以秒计已是 5138 年之后）
+_MS_TS_THRESHOLD = 10 ** 11
+
+
+def _parse_num_ts(v: Any) -> int:
+    """解析时间戳为秒级整数；Drive 返回的时间戳可能为秒或毫秒，毫秒统一换算为秒。"""
+    ts = 0
+    if isinstance(v, str):
+        s = v.strip()
+        # 飞书 file.list 的时间戳多为纯数字字符串，直接 int() 解析，无需经 float 中转
+        if s.isdecimal():
+            ts = int(s)
+        else:
+            try:
+                ts = int(float(s))
+            except (ValueError, OverflowError):
+                return 0
+    elif v is None or isinstance(v, bool):
+        return 0
+    elif isinstance(v, (int, float)):
+        try:
+            ts = int(v)
+        except (ValueError, OverflowError):
+            return 0
+    return ts // 1000 if ts >= _MS_TS_THRESHOLD else ts
+
+
+@dataclass(slots=True)
 class FileInfo:
     """文件信息模型"""
     token: str  # 文件 token
     name: str  # 文件名
     type: str  # 文件类型 (sheet, doc, folder 等)
     parent_token: str  # 父文件夹 token
-    created_time: int  # 创建时间（与飞书 API 一致，数字时间戳）
-    modified_time: int  # 修改时间（与飞书 API 一致，数字时间戳）
+    created_time: int  # 创建时间（秒级时间戳）
+    modified_time: int  # 修改时间（秒级时间戳）
     
     @classmethod
     def from_api_response(cls, data: Any) -> 'FileInfo':
@@ -25,48 +60,30 @@ class FileInfo:
         - name
         - type
         - parent_token
-        - created_time（字符串/数字时间戳：秒或毫秒）
-        - modified_time（字符串/数字时间戳：秒或毫秒）
+        - created_time（字符串/数字时间戳：秒或毫秒，统一换算为秒）
+        - modified_time（字符串/数字时间戳：秒或毫秒，统一换算为秒）
         - 若为 `shortcut`，将解析 `shortcut_info` 并用目标 token 替换，按 token 前缀推断目标类型
         """
-        def _g(obj: Any, key: str) -> Optional[Any]:
-            if isinstance(obj, dict):
-                return obj.get(key)
-            return getattr(obj, key, None)
-
-        def _parse_num_ts(v: Any) -> int:
-            """解析时间戳为整数（不做单位转换，保持与原始数据一致）。"""
-            if v is None:
-                return 0
-            if isinstance(v, bool):
-                return 0
-            if isinstance(v, (int, float)):
-                try:
-                    return int(v)
-                except Exception:
-                    return 0
-            if isinstance(v, str):
-                s = v.strip()
-                try:
-                    # 直接按数字字符串解析
-                    return int(float(s))
-                except Exception:
-                    return 0
-            return 0
+        # 兼容 dict 与 SDK 对象：取值方式按 data 形态判定一次，各字段不再逐个判断
+        if isinstance(data, dict):
+            get = data.get
+        else:
+            def get(key: str) -> Any:
+                return getattr(data, key, None)
 
-        token = _g(data, "token") or ""
-        name = _g(data, "name") or ""
-        parent_token = _g(data, "parent_token") or ""
+        token = get("token") or ""
+        name = get("name") or ""
+        parent_token = get("parent_token") or ""
 
-        file_type = _g(data, "type")
+        file_type = get("type")
         file_type = (file_type or "").lower()
 
-        created_raw = _g(data, "created_time")
-        modified_raw = _g(data, "modified_time")
+        created_raw = get("created_time")
+        modified_raw = get("modified_time")
 
         # 处理快捷方式：用目标 token 替换，并尽量推断目标类型
         if file_type == "shortcut":
-            si = _g(data, "shortcut_info")
+            si = get("shortcut_info")
             target_token = None
             target_type = None
             if isinstance(si, dict):
@@ -79,13 +96,9 @@ class FileInfo:
             if isinstance(target_token, str) and target_token:
                 token = target_token
                 # 根据 token 前缀推断类型（无需 service 层再处理）
-                lt = token.lower()
-                if lt.startswith("sht"):
-                    file_type = "sheet"
-                elif lt.startswith("dox"):
-                    file_type = "docx"
-                elif lt.startswith("box"):
-                    file_type = "file"
+                prefix_type = _SHORTCUT_PREFIX_TYPES.get(token[:3].lower())
+                if prefix_type:
+                    file_type = prefix_type
                 elif isinstance(target_type, str) and target_type:
                     file_type = target_type.lower()
 
@@ -98,12 +111,28 @@ class FileInfo:
             modified_time=_parse_num_ts(modified_raw),
         )
     
+    @staticmethod
+    def _parse_files_bulk(items: List[Any]) -> List['FileInfo']:
+        """批量解析文件列表，解析失败的条目将被跳过。
+
+        解析函数只绑定一次，避免逐条经由 classmethod 描述符分派。
+        """
+        parse = FileInfo.from_api_response
+        files: List[FileInfo] = []
+        append = files.append
+        for item in items:
+            try:
+                append(parse(item))
+            except Exception:
+                continue
+        return files
+
     def is_sheet(self) -> bool:
         """判断是否为表格文件"""
         return self.type.lower() in ["sheet", "spreadsheet", "bitable"]
 
 
-@dataclass
+@dataclass(slots=True)
 class SheetMeta:
     """表格元数据模型"""
     sheet_id: str  # Sheet ID
@@ -130,7 +159,7 @@ class SheetMeta:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SheetValueRange:
     """表格值范围"""
     range: str  # 范围字符串，如 "A1:Z100"
@@ -160,12 +189,10 @@ class SheetValueRange:
     
     def get_col_count(self) -> int:
         """获取列数"""
-        if not self.values:
-            return 0
-        return max(len(row) for row in self.values)
+        return max(map(len, self.values)) if self.values else 0
 
 
-@dataclass 
+@dataclass(slots=True)
 class DriveListResponse:
     """Drive 文件列表响应"""
     files: List[FileInfo]
@@ -192,12 +219,7 @@ class DriveListResponse:
             files_raw = getattr(payload, "files", None) or getattr(payload, "items", None)
         files_raw = files_raw or []
 
-        files: List[FileInfo] = []
-        for item in files_raw:
-            try:
-                files.append(FileInfo.from_api_response(item))
-            except Exception:
-                continue
+        files = FileInfo._parse_files_bulk(files_raw)
 
         # has_more / next_page_token 兼容
         if isinstance(payload, dict):
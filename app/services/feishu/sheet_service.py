@@ -1,15 +1,29 @@
 """
 飞书 Sheet 服务 - 处理表格数据读取
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional
 import asyncio
+import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from app.services.base import BaseService, FeishuAPIError
+from app.services.base import BaseService, FeishuAPIError, FEISHU_ERROR_CODE_RE
 from app.clients.feishu import FeishuClient
+from app.core.config import settings
+from app.services.a1_notation import split_a1
 from .models import SheetMeta, SheetValueRange
 
 
+# 飞书 SDK 为同步调用，统一派发到固定大小的线程池
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.feishu.sheet_concurrency,
+    thread_name_prefix="feishu-sheet",
+)
+
+# A1 表示法：可选的 sheet 名称（可能带引号）+ ! + 列字母 + 行数字 [+ : + 列字母 + 行数字]
+_RANGE_RE = re.compile(r"^(?:(?:'[^']+'|[^!]+)!)?[A-Z]+\d+(?::[A-Z]+\d+)?$")
+
+
 class SheetService(BaseService):
     """飞书 Sheet 服务，负责读取表格数据"""
     
@@ -60,16 +74,18 @@ class SheetService(BaseService):
         if not self._validate_range(range_str):
             raise ValueError(f"无效的范围格式: {range_str}")
         
-        # 使用 asyncio 在异步上下文中调用同步方法
-        loop = asyncio.get_event_loop()
-        
         try:
+            debug = self.logger.isEnabledFor(logging.DEBUG)
             # 添加调试信息：记录请求参数
-            self.log_debug(f"调用飞书 API 参数: spreadsheet_token={spreadsheet_token}, range_str={range_str}, value_render_option={value_render_option}, date_time_render_option={date_time_render_option}")
+            if debug:
+                self.log_debug(
+                    "调用飞书 API 参数: spreadsheet_token=%s, range_str=%s, value_render_option=%s, date_time_render_option=%s",
+                    spreadsheet_token, range_str, value_render_option, date_time_render_option,
+                )
             
             # 调用飞书客户端获取数据
-            values = await loop.run_in_executor(
-                None,
+            values = await asyncio.get_running_loop().run_in_executor(
+                _EXECUTOR,
                 self.feishu_client.read_range_values,
                 spreadsheet_token,
                 range_str,
@@ -78,7 +94,12 @@ class SheetService(BaseService):
             )
             
             # 添加调试信息：记录返回数据的基本信息
-            self.log_debug(f"飞书 API 返回数据: 行数={len(values) if values else 0}, 第一行列数={len(values[0]) if values and len(values) > 0 else 0}")
+            if debug:
+                self.log_debug(
+                    "飞书 API 返回数据: 行数=%d, 第一行列数=%d",
+                    len(values) if values else 0,
+                    len(values[0]) if values else 0,
+                )
             
             # 构造响应格式
             # 注意：read_range_values 只返回 values，我们需要构造完整响应
@@ -92,11 +113,13 @@ class SheetService(BaseService):
                 }
             }
             
-            # 记录指标
-            self.record_metric("rows_fetched", len(values))
-            self.record_metric("cols_fetched", max(len(row) for row in values) if values else 0)
+            # 记录指标（最大列数只计算一次）
+            n_rows = len(values) if values else 0
+            max_cols = max(map(len, values)) if values else 0
+            self.record_metric("rows_fetched", n_rows)
+            self.record_metric("cols_fetched", max_cols)
             
-            self.log_info(f"成功获取表格数据: 行数={len(values)}, 最大列数={max(len(row) for row in values) if values else 0}")
+            self.log_info(f"成功获取表格数据: 行数={n_rows}, 最大列数={max_cols}")
             
             return response
             
@@ -124,6 +147,14 @@ class SheetService(BaseService):
             
             self._handle_api_error(e)
     
+    async def list_sheets(self, spreadsheet_token: str) -> Any:
+        """在专用线程池中调用同步 SDK 列出工作簿内的 sheet，返回原始响应"""
+        return await asyncio.get_running_loop().run_in_executor(
+            _EXECUTOR,
+            self.feishu_client.list_sheets,
+            spreadsheet_token
+        )
+    
     async def get_sheet_meta(
         self,
         spreadsheet_token: str,
@@ -141,16 +172,9 @@ class SheetService(BaseService):
         """
         self.log_info(f"获取表格元数据: token={spreadsheet_token}, sheet={sheet_name}")
         
-        # 使用 asyncio 在异步上下文中调用同步方法
-        loop = asyncio.get_event_loop()
-        
         try:
             # 调用飞书客户端获取 sheets 列表
-            response = await loop.run_in_executor(
-                None,
-                self.feishu_client.list_sheets,
-                spreadsheet_token
-            )
+            response = await self.list_sheets(spreadsheet_token)
             
             # 解析响应
             sheets = response.data.sheets if response.data else []
@@ -204,9 +228,9 @@ class SheetService(BaseService):
                 }
             )
             
+        except FeishuAPIError:
+            raise
         except Exception as e:
-            if isinstance(e, FeishuAPIError):
-                raise
             self._handle_api_error(e)
     
     async def get_sheet_value_range(
@@ -239,10 +263,16 @@ class SheetService(BaseService):
         - Sheet1!A1:Z100
         - 'Sheet Name'!A1:Z100
         """
-        # 基本的 A1 表示法正则
-        # 可选的 sheet 名称（可能带引号）+ ! + 列字母 + 行数字 + : + 列字母 + 行数字
-        pattern = r"^(?:(?:'[^']+'|[^!]+)!)?[A-Z]+\d+(?::[A-Z]+\d+)?$"
-        return bool(re.match(pattern, range_str))
+        # 快速路径：无 '!' 或仅一个 '!' 且 sheet 部分非空时，直接逐字符校验单元格部分；
+        # 其余情况（含引号内 '!' 等）以及快速路径未通过的都交给正则兜底
+        bang = range_str.rfind("!")
+        if bang < 0:
+            if split_a1(range_str) is not None:
+                return True
+        elif bang > 0 and range_str.find("!") == bang:
+            if split_a1(range_str[bang + 1:]) is not None:
+                return True
+        return _RANGE_RE.match(range_str) is not None
     
     def _handle_api_error(self, error: Exception) -> None:
         """处理飞书 API 错误"""
@@ -250,19 +280,21 @@ class SheetService(BaseService):
         
         # 尝试从异常中提取错误码
         error_code = "UNKNOWN"
-        if hasattr(error, 'code'):
+        if getattr(error, "code", None) is not None:
             error_code = str(error.code)
-        elif "code=" in error_msg:
+        else:
             # 从错误信息中提取
-            try:
-                error_code = error_msg.split("code=")[1].split(",")[0]
-            except:
-                pass
+            m = FEISHU_ERROR_CODE_RE.search(error_msg)
+            if m:
+                error_code = m.group(1)
         
         self.log_error(f"飞书 API 错误: {error_code} - {error_msg}")
         
         raise FeishuAPIError(
             message=f"飞书 API 调用失败: {error_msg}",
             code=error_code,
-            details={"error_msg": error_msg}
+            details={
+                "error_msg": error_msg,
+                "feishu_code": int(error_code) if error_code.isdigit() else None,
+            }
         )
@@ -3,12 +3,18 @@ ZSet 有序 ID 索引构建与维护。
 """
 from __future__ import annotations
 
-from typing import Any, AsyncIterator, Iterable, Iterator, List, Dict, Optional
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Iterable, Iterator, List, Dict, Optional, Tuple
 
 from app.services.base import BaseService
 from app.services.cache import RedisService, CacheKeys
 
 
+# gstate 中记录表级组名的字段
+TGROUP_STATE_FIELD = "__tgroup__"
+
+
 class IndexBuilder(BaseService):
     """为表构建/维护 ZSet 索引 xpj:ids:{table}。
 
@@ -39,86 +45,178 @@ class IndexBuilder(BaseService):
         - xpj:gcount:{table}:{group} HASH（计数增减）
         - xpj:gstate:{table}:{id} HASH（记录每个分组字段的当前值）
         """
-        # 解析整数 ID，失败则忽略
-        try:
-            rid = int(row_id)  # type: ignore
-        except (TypeError, ValueError):
-            self.log_warning(f"忽略无效ID，无法转换为 int: table={table}, row_id={row_id}")
-            return
-        client = await self.redis._ensure_connected()
-        # 注入 _table 与 group 字段（group 用于溯源表级分组）
-        row_payload: Dict[str, Any] = dict(row_data)
-        row_payload.setdefault("_table", table)
-        # 同步行 JSON
-        cfg_key = CacheKeys.row_cfgid_key(str(rid))
-        ids_key = CacheKeys.table_ids_key(table)
+        await self.upsert_rows(
+            table,
+            [(row_id, row_data)],
+            group_fields=group_fields,
+            table_group=table_group,
+        )
 
-        # 组字段默认仅处理 Subtype
+    async def upsert_rows(
+        self,
+        table: str,
+        rows: Iterable[Tuple[int | str, Dict[str, Any]]],
+        group_fields: Optional[List[str]] = None,
+        table_group: Optional[str] = None,
+        take_ownership: bool = False,
+        extra_sets: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        批量写入或更新多行，维护的索引与 upsert_row 相同。
+
+        - 所有行的旧分组状态通过一个 pipeline 的 HMGET 一次读回
+        - 所有写命令进入同一个 pipeline，一次 execute
+        - take_ownership=True 时直接在 row_data 上注入 _table/_group，省去逐行 dict 拷贝
+          （仅当调用方不再使用这些 dict 时开启）
+        - extra_sets 中的 {key: value} 随行数据进入同一条 MSET（如表 meta），省去单独的往返
+
+        Returns:
+            实际写入的行数（无效 ID 被忽略）
+        """
+        # 解析整数 ID，失败则忽略；同一批内重复 ID 以最后一行为准（旧状态只读取一次）
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for row_id, row_data in rows:
+            try:
+                rid = int(row_id)  # type: ignore
+            except (TypeError, ValueError):
+                self.log_warning(f"忽略无效ID，无法转换为 int: table={table}, row_id={row_id}")
+                continue
+            parsed[rid] = row_data
+        if not parsed:
+            if extra_sets:
+                await self.redis.mset(extra_sets)
+            return 0
+
+        client = await self.redis._ensure_connected()
+        # 组字段默认仅处理 Subtype；表级组名也记录在 gstate 中一并读取
         gfields = list(group_fields or ["Subtype"])
-        gstate_key = CacheKeys.table_row_group_state_key(table, rid)
+        state_fields = gfields + [TGROUP_STATE_FIELD]
+        # 表级分组（table_group），默认为 default
+        tg_new = (table_group or "").strip() or "default"
 
-        # 读取旧状态
-        old_states: Dict[str, Optional[str]] = {}
+        # 1) 一次往返读取所有行的旧状态
+        old_values: List[Any] = [None] * len(parsed)
         try:
-            if gfields:
-                vals = await client.hmget(gstate_key, gfields)
-                for idx, gf in enumerate(gfields):
-                    old_states[gf] = vals[idx]
+            # gstate 是旧分组的唯一依据，始终逐行读取（ids 索引可能被重建或删除而 gstate 仍在）
+            async with client.pipeline(transaction=False) as pipe:
+                for rid in parsed:
+                    pipe.hmget(CacheKeys.table_row_group_state_key(table, rid), state_fields)
+                old_values = await pipe.execute()
         except Exception:
-            old_states = {}
+            old_values = [None] * len(parsed)
+
+        # 2) 所有写命令进入同一个 pipeline：先以一条 MSET 写入全部行 JSON（行先于索引可见），再排入索引维护命令
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        copy = not take_ownership
+        payloads = [
+            self._build_row_payload(table, row_data, tg_new, copy)
+            for row_data in parsed.values()
+        ]
+        serialize = self.redis._serialize
+        mapping = {
+            CacheKeys.row_cfgid_key(str(rid)): serialize(payload)
+            for rid, payload in zip(parsed, payloads)
+        }
+        if extra_sets:
+            for key, value in extra_sets.items():
+                mapping[key] = serialize(value)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.mset(mapping)
+            for rid, payload, vals in zip(parsed, payloads, old_values):
+                old_states: Dict[str, Optional[str]] = dict(zip(state_fields, vals or ()))
+                self._queue_row_index(pipe, table, rid, payload, gfields, tg_new, old_states, debug)
+            await pipe.execute()
 
-        # 表级分组（table_group），默认为 default
-        tg_new = (table_group or "").strip() or "default"
+        return len(parsed)
+
+    @staticmethod
+    def _build_row_payload(
+        table: str,
+        row_data: Dict[str, Any],
+        tg_new: str,
+        copy: bool = True,
+    ) -> Dict[str, Any]:
+        """生成写入 Redis 的行数据：注入 _table 与 _group 字段（group 用于溯源表级分组）"""
+        row_payload: Dict[str, Any] = dict(row_data) if copy else row_data
+        if "_table" not in row_payload:
+            row_payload["_table"] = table
         # 将表级组名写入行数据（便于溯源）
         row_payload["_group"] = tg_new
+        return row_payload
 
-        async with client.pipeline() as pipe:
-            # 写行 & ids 索引
-            await pipe.set(cfg_key, self.redis._serialize(row_payload))
-            await pipe.zadd(ids_key, {str(rid): float(rid)})
-
-            # 处理分组变更
-            for gf in gfields:
-                # 从行内字段获取分组值
-                new_val_raw = row_payload.get(gf)
-                new_val = None if new_val_raw is None or str(new_val_raw).strip() == "" else str(new_val_raw)
-                old_val = old_states.get(gf)
-                
-                self.log_debug(f"处理分组 {gf}: table={table}, rid={rid}, old_val={old_val}, new_val={new_val}")
-                
-                # 如果旧值存在且与新值不同，从旧分组中移除
-                if old_val and old_val != new_val:
-                    old_gid_key = CacheKeys.table_group_ids_key(table, gf, old_val)
-                    gcount_key = CacheKeys.table_group_count_key(table, gf)
-                    await pipe.zrem(old_gid_key, str(rid))
-                    await pipe.hincrby(gcount_key, old_val, -1)
-                    self.log_debug(f"从旧分组移除: {old_gid_key}")
-                
-                # 如果新值存在且与旧值不同，加入新分组
-                if new_val and new_val != old_val:
-                    new_gid_key = CacheKeys.table_group_ids_key(table, gf, new_val)
-                    gcount_key = CacheKeys.table_group_count_key(table, gf)
-                    await pipe.zadd(new_gid_key, {str(rid): float(rid)})
-                    await pipe.hincrby(gcount_key, new_val, 1)
-                    self.log_debug(f"加入新分组: {new_gid_key}")
-                
-                # 更新 gstate
-                if new_val is None:
-                    await pipe.hdel(gstate_key, gf)
-                else:
-                    await pipe.hset(gstate_key, gf, new_val)
-
-            # 处理表级分组（table_group）
-            tg_state_field = "__tgroup__"
-            tg_old = old_states.get(tg_state_field)
-            if tg_old and tg_old != tg_new:
-                await pipe.zrem(CacheKeys.table_tgroup_ids_key(table, tg_old), str(rid))
-            if tg_new and tg_new != tg_old:
-                await pipe.zadd(CacheKeys.table_tgroup_ids_key(table, tg_new), {str(rid): float(rid)})
-            # 将表级组名也记录在 gstate（避免重复迁移）
-            await pipe.hset(gstate_key, tg_state_field, tg_new)
+    def _queue_row_index(
+        self,
+        pipe: Any,
+        table: str,
+        rid: int,
+        row_payload: Dict[str, Any],
+        gfields: List[str],
+        tg_new: str,
+        old_states: Dict[str, Optional[str]],
+        debug: bool,
+    ) -> None:
+        """将单行的索引写入与迁移命令加入 pipeline（不执行；行 JSON 由调用方写入）。
 
-            await pipe.execute()
+        pipeline 上的命令方法只做缓冲并返回 pipeline 本身，无需 await；
+        真正的网络往返只发生在 execute()。
+        """
+        rid_str = str(rid)
+        # ZADD 成员映射（score=id, member=id），各索引共用
+        member = {rid_str: float(rid)}
+        ids_key = CacheKeys.table_ids_key(table)
+        gstate_key = CacheKeys.table_row_group_state_key(table, rid)
+
+        # ids 索引
+        pipe.zadd(ids_key, member)
+
+        # gstate 的写入/删除先收集，最后合并为一条 HSET 与至多一条 HDEL
+        hset_pairs: Dict[str, str] = {}
+        hdel_fields: List[str] = []
+
+        # 处理分组变更
+        for gf in gfields:
+            # 从行内字段获取分组值
+            new_val_raw = row_payload.get(gf)
+            new_val = None if new_val_raw is None or str(new_val_raw).strip() == "" else str(new_val_raw)
+            old_val = old_states.get(gf)
+            gcount_key = CacheKeys.table_group_count_key(table, gf)
+            
+            if debug:
+                self.log_debug("处理分组 %s: table=%s, rid=%s, old_val=%s, new_val=%s", gf, table, rid, old_val, new_val)
+            
+            # 如果旧值存在且与新值不同，从旧分组中移除
+            if old_val and old_val != new_val:
+                old_gid_key = CacheKeys.table_group_ids_key(table, gf, old_val)
+                pipe.zrem(old_gid_key, rid_str)
+                pipe.hincrby(gcount_key, old_val, -1)
+                if debug:
+                    self.log_debug("从旧分组移除: %s", old_gid_key)
+            
+            # 如果新值存在且与旧值不同，加入新分组
+            if new_val and new_val != old_val:
+                new_gid_key = CacheKeys.table_group_ids_key(table, gf, new_val)
+                pipe.zadd(new_gid_key, member)
+                pipe.hincrby(gcount_key, new_val, 1)
+                if debug:
+                    self.log_debug("加入新分组: %s", new_gid_key)
+            
+            # 更新 gstate
+            if new_val is None:
+                hdel_fields.append(gf)
+            else:
+                hset_pairs[gf] = new_val
+
+        # 处理表级分组（table_group）
+        tg_old = old_states.get(TGROUP_STATE_FIELD)
+        if tg_old and tg_old != tg_new:
+            pipe.zrem(CacheKeys.table_tgroup_ids_key(table, tg_old), rid_str)
+        if tg_new and tg_new != tg_old:
+            pipe.zadd(CacheKeys.table_tgroup_ids_key(table, tg_new), member)
+        # 将表级组名也记录在 gstate（避免重复迁移）
+        hset_pairs[TGROUP_STATE_FIELD] = tg_new
+        pipe.hset(gstate_key, mapping=hset_pairs)
+        if hdel_fields:
+            pipe.hdel(gstate_key, *hdel_fields)
 
     async def delete_row(
         self,
@@ -132,8 +230,9 @@ class IndexBuilder(BaseService):
         except (TypeError, ValueError):
             self.log_warning(f"删除忽略：无效ID，无法转换为 int: table={table}, row_id={row_id}")
             return
+        rid_str = str(rid)
         client = await self.redis._ensure_connected()
-        cfg_key = CacheKeys.row_cfgid_key(str(rid))
+        cfg_key = CacheKeys.row_cfgid_key(rid_str)
         ids_key = CacheKeys.table_ids_key(table)
         gfields = group_fields or ["Subtype"]
         gstate_key = CacheKeys.table_row_group_state_key(table, rid)
@@ -148,17 +247,17 @@ class IndexBuilder(BaseService):
         except Exception:
             existing = {}
 
-        async with client.pipeline() as pipe:
-            await pipe.delete(cfg_key)
-            await pipe.zrem(ids_key, str(rid))
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.delete(cfg_key)
+            pipe.zrem(ids_key, rid_str)
             for gf, val in existing.items():
                 if not val:
                     continue
                 gid_key = CacheKeys.table_group_ids_key(table, gf, val)
                 gcount_key = CacheKeys.table_group_count_key(table, gf)
-                await pipe.zrem(gid_key, str(rid))
-                await pipe.hincrby(gcount_key, val, -1)
-            await pipe.delete(gstate_key)
+                pipe.zrem(gid_key, rid_str)
+                pipe.hincrby(gcount_key, val, -1)
+            pipe.delete(gstate_key)
             await pipe.execute()
 
     async def rebuild_ids(
@@ -166,7 +265,9 @@ class IndexBuilder(BaseService):
         table: str,
         id_iter: AsyncIterator[int] | Iterator[int],
         batch: int = 1000,
+        concurrency: int = 8,
     ) -> int:
+        """重建表的 ids 索引；各批次的写入并发进行，最多 concurrency 个在途。"""
         key = CacheKeys.table_ids_key(table)
         client = await self.redis._ensure_connected()
 
@@ -175,35 +276,42 @@ class IndexBuilder(BaseService):
 
         written = 0
         batch_items: List[int] = []
+        sem = asyncio.Semaphore(max(concurrency, 1))
+        inflight: List[asyncio.Task] = []
 
         async def _flush(items: List[int]) -> None:
             nonlocal written
+            try:
+                # 单条 ZADD key s1 m1 s2 m2 ... 写入整批
+                await client.zadd(key, {str(i): float(i) for i in items})
+                written += len(items)
+            finally:
+                sem.release()
+
+        async def _submit(items: List[int]) -> None:
             if not items:
                 return
-            async with client.pipeline() as pipe:
-                for i in items:
-                    # ZADD key score member
-                    await pipe.zadd(key, {str(i): float(i)})
-                await pipe.execute()
-            written += len(items)
+            # 先占用并发名额再创建任务，保证在途批次（及其内存）有上限
+            await sem.acquire()
+            inflight.append(asyncio.create_task(_flush(items)))
 
         # 兼容同步/异步迭代器
-        if hasattr(id_iter, "__anext__"):
-            async for i in id_iter:  # type: ignore
-                batch_items.append(int(i))
-                if len(batch_items) >= batch:
-                    await _flush(batch_items)
-                    batch_items = []
-            if batch_items:
-                await _flush(batch_items)
-        else:
-            for i in id_iter:  # type: ignore
-                batch_items.append(int(i))
-                if len(batch_items) >= batch:
-                    await _flush(batch_items)
-                    batch_items = []
-            if batch_items:
-                await _flush(batch_items)
+        try:
+            if hasattr(id_iter, "__anext__"):
+                async for i in id_iter:  # type: ignore
+                    batch_items.append(int(i))
+                    if len(batch_items) >= batch:
+                        await _submit(batch_items)
+                        batch_items = []
+            else:
+                for i in id_iter:  # type: ignore
+                    batch_items.append(int(i))
+                    if len(batch_items) >= batch:
+                        await _submit(batch_items)
+                        batch_items = []
+            await _submit(batch_items)
+        finally:
+            await asyncio.gather(*inflight)
 
         return written
 
@@ -215,15 +323,16 @@ class IndexBuilder(BaseService):
     ) -> Dict[str, int]:
         key = CacheKeys.table_ids_key(table)
         client = await self.redis._ensure_connected()
-        added = 0
-        removed = 0
-        async with client.pipeline() as pipe:
-            for i in add_ids or []:
-                await pipe.zadd(key, {str(int(i)): float(int(i))})
-                added += 1
-            for i in remove_ids or []:
-                await pipe.zrem(key, str(int(i)))
-                removed += 1
+        add_list = [int(i) for i in (add_ids or [])]
+        rem_list = [str(int(i)) for i in (remove_ids or [])]
+        added = len(add_list)
+        removed = len(rem_list)
+        # 增删各合并为一条变长命令
+        async with client.pipeline(transaction=False) as pipe:
+            if add_list:
+                pipe.zadd(key, {str(i): float(i) for i in add_list})
+            if rem_list:
+                pipe.zrem(key, *rem_list)
             await pipe.execute()
 
         size = int(await client.zcard(key))
@@ -241,7 +350,7 @@ class IndexBuilder(BaseService):
         key = CacheKeys.table_ids_key(table)
         client = await self.redis._ensure_connected()
         members: List[str] = await client.zrange(key, start, stop)
-        return [int(m) for m in members]
+        return list(map(int, members))
 
     async def ids_by_score(
         self,
@@ -256,7 +365,7 @@ class IndexBuilder(BaseService):
         members: List[str] = await client.zrangebyscore(
             key, min_score, max_score, start=offset, num=limit
         )
-        return [int(m) for m in members]
+        return list(map(int, members))
 
     async def group_ids_range(
         self,
@@ -269,7 +378,7 @@ class IndexBuilder(BaseService):
         key = CacheKeys.table_group_ids_key(table, group, value)
         client = await self.redis._ensure_connected()
         members: List[str] = await client.zrange(key, start, stop)
-        return [int(m) for m in members]
+        return list(map(int, members))
 
     async def group_counts(self, table: str, group: str) -> Dict[str, int]:
         key = CacheKeys.table_group_count_key(table, group)
@@ -290,9 +399,13 @@ class IndexBuilder(BaseService):
             if not keys:
                 if cursor == 0:
                     break
-            for k in keys:
+            # 每个 SCAN 批次一次 MGET 取回全部值，而非逐键 GET
+            try:
+                values = await client.mget(keys) if keys else []
+            except Exception:
+                values = []
+            for data in values:
                 try:
-                    data = await client.get(k)
                     if not data:
                         continue
                     obj = self.redis._deserialize(data)
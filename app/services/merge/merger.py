@@ -1,8 +1,9 @@
 """
 Sheet 合并器 - 执行多个 Sheet 的合并操作
 """
-from typing import Dict, List, Any, Callable, Awaitable, Optional
+from typing import Dict, List, Any, Callable, Awaitable, Optional, Set
 import asyncio
+from itertools import chain
 
 from app.services.base import BaseService
 from app.services.transform.schema import SheetConfig
@@ -15,6 +16,8 @@ class SheetMerger(BaseService):
     def __init__(self, rule_manager: Optional[MergeRuleManager] = None):
         super().__init__("SheetMerger")
         self.rule_manager = rule_manager or MergeRuleManager()
+        # 已告警过的未知合并策略
+        self._warned_strategies: Set[str] = set()
     
     async def merge_group(
         self,
@@ -48,61 +51,30 @@ class SheetMerger(BaseService):
         # 结果容器
         result = {}
         
-        # 用于检测主键冲突
-        key_source_map = {}  # {key: (sub_type, data)}
+        # 用于检测主键冲突：只记录首个归属子类型，数据从 result[owner][key] 取得
+        key_owner: Dict[str, str] = {}
+        # merge_fields 已产出副本的键：其 result 中的 dict 归本方法所有，可原地合并
+        owned: Set[str] = set()
         
-        # 并发获取所有 sheet 的数据
-        tasks = []
-        for config in configs:
-            tasks.append(self._fetch_sheet_data(config, fetch_structured))
+        # 并发获取所有 sheet 的数据（全部立即启动）
+        tasks = [
+            asyncio.ensure_future(self._fetch_sheet_data(config, fetch_structured))
+            for config in configs
+        ]
         
-        # 等待所有数据获取完成
-        sheet_data_list = await asyncio.gather(*tasks)
-        
-        # 合并数据
-        for config, sheet_data in zip(configs, sheet_data_list):
-            if sheet_data is None:
-                continue
-                
-            sub_type = config.sub_type or "default"
-            
-            # 初始化子类型容器
-            if sub_type not in result:
-                result[sub_type] = {}
-            
-            # 合并数据并检查冲突
-            for key, row_data in sheet_data.items():
-                if key in key_source_map:
-                    # 处理主键冲突
-                    existing_sub_type, existing_data = key_source_map[key]
-                    if existing_sub_type != sub_type:
-                        self.log_warning(
-                            f"主键冲突: {key} 同时存在于 {existing_sub_type} 和 {sub_type}"
-                        )
-                        # 根据策略处理冲突
-                        resolved_data = self._resolve_conflict(
-                            key=key,
-                            existing_data=existing_data,
-                            existing_sub_type=existing_sub_type,
-                            new_data=row_data,
-                            new_sub_type=sub_type,
-                            strategy=merge_rule.conflict_strategy
-                        )
-                        if resolved_data:
-                            result[sub_type][key] = resolved_data
-                    else:
-                        # 同一子类型内的重复，根据策略合并
-                        merged = self._merge_data_with_strategy(
-                            existing_data,
-                            row_data,
-                            merge_rule.conflict_strategy
-                        )
-                        result[sub_type][key] = merged
-                        key_source_map[key] = (sub_type, merged)
-                else:
-                    # 新键，直接添加
-                    result[sub_type][key] = row_data
-                    key_source_map[key] = (sub_type, row_data)
+        # 按配置顺序逐个等待并合并：前面的 sheet 一到达即开始合并，与后续请求重叠；
+        # 合并顺序固定，冲突处理结果保持确定性
+        try:
+            for config, task in zip(configs, tasks):
+                sheet_data = await task
+                if sheet_data is None:
+                    continue
+                self._merge_sheet_into(
+                    result, key_owner, owned, config, sheet_data, merge_rule
+                )
+        finally:
+            for task in tasks:
+                task.cancel()
         
         # 记录统计信息
         total_rows = sum(len(data) for data in result.values())
@@ -114,6 +86,61 @@ class SheetMerger(BaseService):
         
         return result
     
+    def _merge_sheet_into(
+        self,
+        result: Dict[str, Dict[str, Dict[str, Any]]],
+        key_owner: Dict[str, str],
+        owned: Set[str],
+        config: SheetConfig,
+        sheet_data: Dict[str, Dict[str, Any]],
+        merge_rule: MergeRule,
+    ) -> None:
+        """将单个 sheet 的数据并入 result，并检查主键冲突"""
+        log_warning = self.log_warning
+        sub_type = config.sub_type or "default"
+        
+        # 初始化子类型容器
+        sub_result = result.setdefault(sub_type, {})
+        
+        # 合并数据并检查冲突
+        for key, row_data in sheet_data.items():
+            existing_sub_type = key_owner.get(key)
+            if existing_sub_type is not None:
+                # 处理主键冲突
+                existing_data = result[existing_sub_type][key]
+                if existing_sub_type != sub_type:
+                    log_warning(
+                        f"主键冲突: {key} 同时存在于 {existing_sub_type} 和 {sub_type}"
+                    )
+                    # 根据策略处理冲突
+                    resolved_data = self._resolve_conflict(
+                        key=key,
+                        existing_data=existing_data,
+                        existing_sub_type=existing_sub_type,
+                        new_data=row_data,
+                        new_sub_type=sub_type,
+                        strategy=merge_rule.conflict_strategy
+                    )
+                    if resolved_data:
+                        sub_result[key] = resolved_data
+                elif key in owned:
+                    # 同一子类型内再次重复：已是本方法的副本，原地字段级合并
+                    self._merge_fields_inplace(existing_data, row_data)
+                else:
+                    # 同一子类型内的重复，根据策略合并（输入 dict 属调用方，首次合并需复制）
+                    merged = self._merge_data_with_strategy(
+                        existing_data,
+                        row_data,
+                        merge_rule.conflict_strategy
+                    )
+                    sub_result[key] = merged
+                    if merge_rule.conflict_strategy == "merge_fields":
+                        owned.add(key)
+            else:
+                # 新键，直接添加
+                sub_result[key] = row_data
+                key_owner[key] = sub_type
+    
     async def _fetch_sheet_data(
         self,
         config: SheetConfig,
@@ -145,36 +172,57 @@ class SheetMerger(BaseService):
         Returns:
             合并后的数据
         """
-        if strategy == "last_win":
-            # 新数据覆盖
-            return new_data
-        
-        elif strategy == "first_win":
-            # 保留原数据
-            return existing_data
-        
-        elif strategy == "merge_fields":
-            # 字段级合并
-            result = existing_data.copy()
-            for field, value in new_data.items():
-                if field not in result or result[field] is None:
-                    result[field] = value
-                elif value is not None:
-                    # 如果都有值，可能需要更复杂的合并逻辑
-                    # 这里简单处理：数组合并，其他覆盖
-                    if isinstance(result[field], list) and isinstance(value, list):
-                        # 合并数组（去重）
-                        merged_list = result[field] + value
-                        result[field] = list(dict.fromkeys(merged_list))
-                    else:
-                        # 其他类型直接覆盖
-                        result[field] = value
-            return result
-        
-        else:
-            # 默认策略：覆盖
-            self.log_warning(f"未知的合并策略: {strategy}，使用默认覆盖策略")
+        handler = _STRATEGIES.get(strategy)
+        if handler is None:
+            # 默认策略：覆盖（同一未知策略只告警一次）
+            if strategy not in self._warned_strategies:
+                self._warned_strategies.add(strategy)
+                self.log_warning(f"未知的合并策略: {strategy}，使用默认覆盖策略")
             return new_data
+        return handler(existing_data, new_data)
+    
+    @staticmethod
+    def _merge_fields_impl(
+        existing_data: Dict[str, Any],
+        new_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """字段级合并，返回新 dict（不修改输入）"""
+        result = existing_data.copy()
+        SheetMerger._merge_fields_inplace(result, new_data)
+        return result
+    
+    @staticmethod
+    def _merge_fields_inplace(
+        existing_data: Dict[str, Any],
+        new_data: Dict[str, Any]
+    ) -> None:
+        """字段级合并，直接修改 existing_data：空值补齐，数组合并去重，其他类型新值覆盖。
+
+        调用方需确保 existing_data 不被其他地方引用。
+        """
+        for field, value in new_data.items():
+            current = existing_data.get(field)
+            if current is None:
+                existing_data[field] = value
+            elif value is not None:
+                # 如果都有值，可能需要更复杂的合并逻辑
+                # 这里简单处理：数组合并，其他覆盖
+                if isinstance(current, list) and isinstance(value, list):
+                    # 合并数组（保序去重，单次遍历；不可哈希元素如 dict 原样保留）
+                    seen = set()
+                    merged_list = []
+                    for item in chain(current, value):
+                        try:
+                            if item in seen:
+                                continue
+                            seen.add(item)
+                        except TypeError:
+                            pass
+                        merged_list.append(item)
+                    existing_data[field] = merged_list
+                else:
+                    # 其他类型直接覆盖
+                    existing_data[field] = value
     
     def _resolve_conflict(
         self,
@@ -240,17 +288,23 @@ class SheetMerger(BaseService):
         
         result = {}
         
+        strategy = merge_rule.conflict_strategy
+        merge = self._merge_data_with_strategy
         # 按子类型顺序处理（可配置优先级）
-        for sub_type in sorted(sheets_data.keys()):
+        for sub_type in sorted(sheets_data):
             for key, data in sheets_data[sub_type].items():
                 if key in result:
                     # 合并冲突
-                    result[key] = self._merge_data_with_strategy(
-                        result[key],
-                        data,
-                        merge_rule.conflict_strategy
-                    )
+                    result[key] = merge(result[key], data, strategy)
                 else:
                     result[key] = data
         
         return result
+
+
+# 合并策略分派表：策略名 -> (existing, new) -> merged
+_STRATEGIES: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {
+    "last_win": lambda existing, new: new,  # 新数据覆盖
+    "first_win": lambda existing, new: existing,  # 保留原数据
+    "merge_fields": SheetMerger._merge_fields_impl,  # 字段级合并
+}
@@ -2,10 +2,19 @@
 合并规则定义 - 识别组名和子类型
 """
 import re
+from functools import lru_cache
 from typing import Tuple, Optional, Dict
 from dataclasses import dataclass
 
 
+# 模式1: Config_XXX(sub_type) - 最常见模式
+_PAT1 = re.compile(r'^(?P<group>Config_[A-Za-z0-9_]+)\((?P<sub>[^)]+)\)$')
+# 模式2: Config_XXX_sub_type - 下划线分隔
+_PAT2 = re.compile(r'^(?P<group>Config_[A-Za-z0-9]+)_(?P<sub>[a-z]+)$')
+# 模式3: Config_XXX[sub_type] - 方括号模式
+_PAT3 = re.compile(r'^(?P<group>Config_[A-Za-z0-9_]+)\[(?P<sub>[^\]]+)\]$')
+
+
 @dataclass
 class MergeRule:
     """合并规则配置"""
@@ -14,6 +23,7 @@ class MergeRule:
     conflict_strategy: str = "last_win"  # 冲突策略: last_win, first_win, merge_fields
 
 
+@lru_cache(maxsize=4096)
 def identify_group_and_sub(sheet_name: str) -> Tuple[Optional[str], Optional[str]]:
     """
     识别 Sheet 的组名和子类型
@@ -26,29 +36,17 @@ def identify_group_and_sub(sheet_name: str) -> Tuple[Optional[str], Optional[str
         例如: ("Config_Unit", "hero")
         如果不匹配返回 (None, None)
     """
-    # 模式1: Config_XXX(sub_type) - 最常见模式
-    pattern1 = r'^(?P<group>Config_[A-Za-z0-9_]+)\((?P<sub>[^)]+)\)$'
-    match = re.match(pattern1, sheet_name)
-    if match:
-        return match.group('group'), match.group('sub')
+    # 所有模式都以 Config_ 开头，前缀不符直接返回
+    if not sheet_name.startswith("Config_"):
+        return None, None
     
-    # 模式2: Config_XXX_sub_type - 下划线分隔
-    pattern2 = r'^(?P<group>Config_[A-Za-z0-9]+)_(?P<sub>[a-z]+)$'
-    match = re.match(pattern2, sheet_name)
-    if match:
-        return match.group('group'), match.group('sub')
-    
-    # 模式3: Config_XXX[sub_type] - 方括号模式
-    pattern3 = r'^(?P<group>Config_[A-Za-z0-9_]+)\[(?P<sub>[^\]]+)\]$'
-    match = re.match(pattern3, sheet_name)
-    if match:
-        return match.group('group'), match.group('sub')
+    for pattern in (_PAT1, _PAT2, _PAT3):
+        match = pattern.match(sheet_name)
+        if match:
+            return match.group('group'), match.group('sub')
     
     # 不匹配任何模式，返回整个名称作为组名
-    if sheet_name.startswith("Config_"):
-        return sheet_name, None
-    
-    return None, None
+    return sheet_name, None
 
 
 class MergeRuleManager:
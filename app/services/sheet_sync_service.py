@@ -2,6 +2,10 @@
 Sheet 同步服务：读取指定 spreadsheet_token 的首个（或指定）Sheet，
 基于表格顶部前四行推断 JSON Schema，将每行数据解析为 JSON 并写入 Redis。
 """
+import asyncio
+import weakref
+from functools import lru_cache
+from operator import itemgetter
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
@@ -15,6 +19,71 @@ from app.services.transform.schema import SheetSchemaBuilder
 from app.core.config import settings
 
 
+# 表 meta 层的整数/浮点类型归一化集合（含 fp32/fp64/decimal/number）
+_INT_TYPES = frozenset({
+    "int", "int32", "int64", "sint32", "sint64",
+    "uint", "uint32", "uint64", "integer", "i32", "i64",
+})
+_FLOAT_TYPES = frozenset({"float", "double", "fp32", "fp64", "number", "decimal"})
+
+
+def _map_type(t: str) -> str:
+    """将 schema 类型归一化为 int/float/str"""
+    t_lower = (t or "").strip().lower()
+    if t_lower in _INT_TYPES:
+        return "int"
+    if t_lower in _FLOAT_TYPES:
+        return "float"
+    # 其它一律按字符串处理（包括 bool/array/json/bytes 等，在表 meta 层不细分）
+    return "str"
+
+
+@lru_cache(maxsize=256)
+def _build_columns(headers: Tuple[str, ...], types: Tuple[str, ...]) -> Tuple[Dict[str, str], ...]:
+    """由表头与类型生成 columns 描述；返回值被缓存共享，调用方不得修改"""
+    return tuple({"name": name, "type": _map_type(t)} for name, t in zip(headers, types))
+
+
+def _is_int_key(key: str) -> bool:
+    """判断行键是否为十进制整数字符串（可带负号），不触发异常路径"""
+    digits = key[1:] if key[:1] == "-" else key
+    return digits.isdecimal()
+
+
+@lru_cache(maxsize=4096)
+def _col_num_to_letters(n: int) -> str:
+    """列号转列字母（n >= 1）；取值空间小且固定，结果缓存"""
+    letters: List[str] = []
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters.append(chr(65 + rem))
+    return "".join(reversed(letters))
+
+
+@lru_cache(maxsize=1024)
+def _a1_range(sheet_id: str, rows: int, cols: int) -> str:
+    """整表读取范围（sheet_id!A1:{列}{行}），轮询时同一 sheet 反复使用"""
+    return f"{sheet_id}!A1:{_col_num_to_letters(cols)}{rows}"
+
+
+def _field(obj: Any, name: str) -> Any:
+    """读取 dict 键或对象属性（SDK 响应两种形态兼有），缺失返回 None"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _as_int(v: Any) -> int:
+    """SDK 返回的计数通常已是 int，仅在必要时转换；空值视为 0"""
+    return v if type(v) is int else int(v or 0)
+
+
+# sources 条目的去重字段
+_SOURCE_FIELDS = itemgetter("spreadsheet_token", "sheet_id", "title")
+
+
 class SheetSyncService(BaseService):
     """Sheet 同步到 Redis 的服务"""
 
@@ -30,6 +99,8 @@ class SheetSyncService(BaseService):
         self.transformer = transformer
         # 用于维护 ids/gids/gcount/gstate
         self.index = IndexBuilder(redis_service)
+        # 表级写入锁：table -> Lock（弱引用，无人持有或等待时自动回收）
+        self._table_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
     async def sync_sheet(
         self,
@@ -48,66 +119,31 @@ class SheetSyncService(BaseService):
         list_resp = await self._list_sheets(spreadsheet_token)
         sheets = list_resp.get("sheets", [])
 
-        per_sheet_results: List[Dict[str, Any]] = []
-        total_rows_written = 0
-            
-        for s in sheets:
-            sheet_id = s.get("sheet_id") or s.get("sheetId") or ""
-            sheet_title = s.get("title") or s.get("name") or sheet_id or "Sheet1"
-            # 解析 base_table 与 table_group（形如 Base(Group)）
-            table_group = self._extract_table_group(sheet_title)
-            base_table = self._strip_group_from_table_name(sheet_title)
-            # 如果没有括号组名，使用默认组
-            if not table_group:
-                table_group = "default"
-            gp = s.get("grid_properties", {}) or {}
-            rows = int(gp.get("row_count", 0) or 0)
-            cols = int(gp.get("column_count", 0) or 0)
-            rows = max(rows, 1)
-            cols = max(cols, 1)
-
-            a1_range_by_id = f"{sheet_id}!A1:{self._col_number_to_letters(cols)}{rows}"
-
-            # 2) 读取数据（values）：只使用 sheet_id 形式，符合 Feishu API 标准
-            raw = await self.sheet_service.get_sheet_values(
-                spreadsheet_token=spreadsheet_token,
-                range_str=a1_range_by_id,
-            )
-            values_raw: List[List[Any]] = raw.get("valueRange", {}).get("values", [])
+        # 按 base_table 分组（保持工作簿内顺序）：同表的多个 sheet（不同 table_group）
+        # 的 meta 合并与同 ID 行覆盖依赖先后顺序，组内须按原顺序串行
+        table_sheets: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        for i, s in enumerate(sheets):
+            table = self._strip_group_from_table_name(s["title"] or s["sheet_id"] or "Sheet1")
+            table_sheets.setdefault(table, []).append((i, s))
 
-            # 3) 通过 SchemaBuilder 生成 schema 与列投影
-            builder = SheetSchemaBuilder(settings.table)
-            schema, kept_indices = builder.infer(values_raw)
-            # 将原始二维数组按 kept_indices 投影
-            values = self._project_columns(values_raw, kept_indices)
+        # 2) 不同表并发同步（拉取受信号量约束），同表 sheet 依序同步
+        sem = asyncio.Semaphore(settings.feishu.sheet_concurrency)
+        per_sheet_results: List[Dict[str, Any]] = [{}] * len(sheets)
 
-            # 4) 解析行并批量写入 Redis
-            row_count, written_keys = await self._write_rows_to_redis(
-                spreadsheet_token=spreadsheet_token,
-                table=base_table,
-                table_group=table_group,
-                values=values,
-                schema=schema,
-            )
-            total_rows_written += row_count
+        async def _sync_table(entries: List[Tuple[int, Dict[str, Any]]]) -> None:
+            for i, s in entries:
+                per_sheet_results[i] = await self._sync_one_sheet(spreadsheet_token, s, sem)
 
-            # 写入 table 级 schema 与 meta（替代原先 sheet 级 schema/meta）
-            await self._write_table_meta(
-                table=base_table,
-                schema=schema,
-                spreadsheet_token=spreadsheet_token,
-                sheet_id=sheet_id,
-                sheet_title=sheet_title,
-                table_group=table_group,
-            )
+        results = await asyncio.gather(
+            *(_sync_table(entries) for entries in table_sheets.values()),
+            return_exceptions=True,
+        )
+        # 保持原有语义：任一 sheet 失败则整体失败（此时其余表均已结束）
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
 
-            per_sheet_results.append({
-                "sheet_id": sheet_id,
-                "sheet_name": sheet_title,
-                "rows_written": row_count,
-                "schema_key": CacheKeys.table_schema_key(sheet_title),
-                "row_keys_sample": written_keys[:10],
-            })
+        total_rows_written = sum(r["rows_written"] for r in per_sheet_results)
 
         # 移除原 sheet 容器级 meta 的写入（以 table meta 取代）
 
@@ -118,6 +154,127 @@ class SheetSyncService(BaseService):
             "note": "table meta written per sheet",
         }
 
+    async def _sync_one_sheet(
+        self,
+        spreadsheet_token: str,
+        s: Dict[str, Any],
+        sem: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        """同步单个 sheet：读取、推断 schema、写入行与 table meta，返回该 sheet 的结果条目。"""
+        # _list_sheets 已归一化为 {"sheet_id", "title", "grid_properties": {"row_count", "column_count"}}
+        sheet_id = s["sheet_id"]
+        sheet_title = s["title"] or sheet_id or "Sheet1"
+        # 解析 base_table 与 table_group（形如 Base(Group)）
+        table_group = self._extract_table_group(sheet_title)
+        base_table = self._strip_group_from_table_name(sheet_title)
+        # 如果没有括号组名，使用默认组
+        if not table_group:
+            table_group = "default"
+        gp = s["grid_properties"]
+        rows = max(gp["row_count"], 1)
+        cols = max(gp["column_count"], 1)
+
+        # 按行分块读取与写入（飞书单次读取行数有限，且可避免整表数据同时驻留内存）
+        chunk_rows = settings.feishu.sheet_read_rows
+        first_end = min(rows, chunk_rows)
+
+        # 读取数据（values）：只使用 sheet_id 形式，符合 Feishu API 标准
+        values_raw = await self._read_values(
+            spreadsheet_token, _a1_range(sheet_id, first_end, cols), sem
+        )
+
+        # 通过 SchemaBuilder 生成 schema 与列投影（仅基于首块，表头行均在其中）
+        builder = SheetSchemaBuilder(settings.table)
+        schema, kept_indices = builder.infer(values_raw)
+        # 将原始二维数组按 kept_indices 投影
+        values = self._project_columns(values_raw, kept_indices)
+        del values_raw
+
+        # 后续分块不含表头行，前置占位空行使 schema.data_start_row 的偏移依旧适用
+        header_pad: List[List[Any]] = [[]] * max(schema.data_start_row - 1, 0)
+
+        row_count = 0
+        written_keys: List[str] = []
+        start = first_end + 1
+        # 预取下一块：写入当前块的同时读取下一块，飞书读取与 Redis 写入重叠（至多两块同时驻留内存）
+        next_read: Optional[asyncio.Future] = None
+        try:
+            while True:
+                last = start > rows
+                if not last:
+                    end = min(rows, start + chunk_rows - 1)
+                    next_read = asyncio.ensure_future(self._read_values(
+                        spreadsheet_token, f"{sheet_id}!A{start}:{_col_num_to_letters(cols)}{end}", sem
+                    ))
+                # 同一 base_table 可能来自多个 sheet（不同 table_group），
+                # 其 gstate 读改写与 meta 的 sources 合并需串行，避免互相覆盖
+                async with self._table_lock(base_table):
+                    # 最后一块时生成 table 级 meta（替代原先 sheet 级 schema/meta），随行数据同一次 MSET 写入
+                    meta: Optional[Dict[str, Any]] = None
+                    if last:
+                        meta = await self._build_table_meta(
+                            table=base_table,
+                            schema=schema,
+                            spreadsheet_token=spreadsheet_token,
+                            sheet_id=sheet_id,
+                            sheet_title=sheet_title,
+                            table_group=table_group,
+                        )
+                    # 解析行并批量写入 Redis
+                    n, keys = await self._write_rows_to_redis(
+                        spreadsheet_token=spreadsheet_token,
+                        table=base_table,
+                        table_group=table_group,
+                        values=values,
+                        schema=schema,
+                        extra_sets={CacheKeys.table_meta_key(base_table): meta} if last else None,
+                    )
+                row_count += n
+                if len(written_keys) < 10:
+                    written_keys.extend(keys[: 10 - len(written_keys)])
+                del values
+
+                if last:
+                    break
+                chunk_raw = await next_read
+                next_read = None
+                values = header_pad + self._project_columns(chunk_raw, kept_indices)
+                del chunk_raw
+                start = end + 1
+        finally:
+            # 写入失败时取消尚未消费的预取
+            if next_read is not None:
+                next_read.cancel()
+
+        return {
+            "sheet_id": sheet_id,
+            "sheet_name": sheet_title,
+            "rows_written": row_count,
+            "schema_key": CacheKeys.table_schema_key(sheet_title),
+            "row_keys_sample": written_keys[:10],
+        }
+
+    async def _read_values(
+        self,
+        spreadsheet_token: str,
+        range_str: str,
+        sem: asyncio.Semaphore,
+    ) -> List[List[Any]]:
+        """在并发信号量内读取指定范围的二维数组"""
+        async with sem:
+            raw = await self.sheet_service.get_sheet_values(
+                spreadsheet_token=spreadsheet_token,
+                range_str=range_str,
+            )
+        return raw.get("valueRange", {}).get("values", [])
+
+    def _table_lock(self, table: str) -> asyncio.Lock:
+        """获取表级锁（服务为单例，锁跨请求共享）"""
+        lock = self._table_locks.get(table)
+        if lock is None:
+            lock = self._table_locks[table] = asyncio.Lock()
+        return lock
+
     async def _write_rows_to_redis(
         self,
         spreadsheet_token: str,
@@ -125,93 +282,96 @@ class SheetSyncService(BaseService):
         table_group: Optional[str],
         values: List[List[Any]],
         schema: SheetSchema,
+        extra_sets: Optional[Dict[str, Any]] = None,
     ) -> Tuple[int, List[str]]:
-        """将数据行写入 Redis，返回成功写入的行数和键样本。"""
-        if not values:
-            return 0, []
+        """将数据行写入 Redis，返回成功写入的行数和键样本。
 
-        # 以 transformer 解析为结构化字典 {key: row_data}
-        structured = self.transformer.transform_to_structured(values, schema)
-        if not structured:
+        extra_sets（如 table meta）随最后一批行数据同一条 MSET 写入；无有效行时单独写入。
+        """
+        rows = self._collect_rows(table, values, schema)
+        if not rows:
+            if extra_sets:
+                await self.redis.mset(extra_sets)
             return 0, []
 
+        # 使用 IndexBuilder 分批写入并维护索引（每批一个 pipeline，限制单次 flush 的缓冲与阻塞时长）；
+        # structured 为本地临时数据，可直接交出所有权
+        batch_size = settings.redis.write_batch_size
+        last_start = (len(rows) - 1) // batch_size * batch_size
         written = 0
-        keys_sample: List[str] = []
-
-        # 使用 IndexBuilder 逐行写入并维护索引
-        for row_key, row_data in structured.items():
-            # 仅处理可转换为整数的 ID；否则跳过并记录
-            try:
-                int(row_key)
-            except (TypeError, ValueError):
-                self.log_warning(f"跳过无效ID（非整数）: table={table}, row_id={row_key}")
-                continue
-            await self.index.upsert_row(
+        for start in range(0, len(rows), batch_size):
+            written += await self.index.upsert_rows(
                 table=table,
-                row_id=row_key,
-                row_data=row_data,
+                rows=rows[start:start + batch_size],
                 group_fields=["Subtype"],
                 table_group=table_group or "default",
+                take_ownership=True,
+                extra_sets=extra_sets if start == last_start else None,
             )
-            redis_key = CacheKeys.row_cfgid_key(str(row_key))
-            written += 1
-            if len(keys_sample) < 20:
-                keys_sample.append(redis_key)
+        keys_sample = [CacheKeys.row_cfgid_key(str(row_key)) for row_key, _ in rows[:20]]
 
         return written, keys_sample
 
+    def _collect_rows(
+        self,
+        table: str,
+        values: List[List[Any]],
+        schema: SheetSchema,
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """将二维数组解析为 [(row_key, row_data)]，仅保留整数 ID 的行。"""
+        if not values:
+            return []
+
+        # 去掉末尾全空行（飞书 row_count 常大于实际数据行数），减少后续解析与分配
+        is_empty = self.transformer._is_empty_value
+        data_start = max(schema.data_start_row - 1, 0)
+        end = len(values)
+        while end > data_start and all(is_empty(v) for v in values[end - 1]):
+            end -= 1
+        if end < len(values):
+            values = values[:end]
+
+        # 以 transformer 解析为结构化字典 {key: row_data}
+        structured = self.transformer.transform_to_structured(values, schema)
+        if not structured:
+            return []
+
+        # 仅处理可转换为整数的 ID；否则跳过并记录
+        rows: List[Tuple[str, Dict[str, Any]]] = []
+        append = rows.append
+        for row_key, row_data in structured.items():
+            # 常见的纯数字 ID 走快速判断；其余（含空白、+ 号等）再交给 int() 兜底
+            if not _is_int_key(row_key):
+                try:
+                    int(row_key)
+                except (TypeError, ValueError):
+                    self.log_warning(f"跳过无效ID（非整数）: table={table}, row_id={row_key}")
+                    continue
+            append((row_key, row_data))
+        return rows
+
     def _project_columns(self, values: List[List[Any]], kept_indices: List[int]) -> List[List[Any]]:
         if not values or not kept_indices:
             return values
+        # itemgetter 在 C 层完成取列；短行先补齐 None 再取
+        width = max(kept_indices) + 1
+        getter = itemgetter(*kept_indices)
         projected: List[List[Any]] = []
+        append = projected.append
+        if len(kept_indices) == 1:
+            # 单列时 itemgetter 返回标量
+            for row in values:
+                if len(row) < width:
+                    row = list(row) + [None] * (width - len(row))
+                append([getter(row)])
+            return projected
         for row in values:
-            projected.append([row[i] if i < len(row) else None for i in kept_indices])
+            if len(row) < width:
+                row = list(row) + [None] * (width - len(row))
+            append(list(getter(row)))
         return projected
 
-    async def _write_schema_and_meta(
-        self,
-        spreadsheet_token: str,
-        sheet_name: str,
-        schema: SheetSchema,
-        meta: Dict[str, Any],
-    ) -> None:
-        schema_key = CacheKeys.sheet_schema_key(spreadsheet_token, sheet_name)
-        meta_key = CacheKeys.sheet_meta_key(spreadsheet_token)
-
-        # 将 dataclass Schema 转为可序列化 dict
-        schema_dict = {
-            "key_column": schema.key_column,
-            "headers": schema.headers,
-            "header_row": schema.header_row,
-            "data_start_row": schema.data_start_row,
-            "type_mapping": schema.type_mapping,
-            "array_columns": schema.array_columns,
-            "json_columns": schema.json_columns,
-        }
-        await self.redis.set(schema_key, schema_dict)
-        await self.redis.set(meta_key, meta)
-
-    async def _write_schema(
-        self,
-        spreadsheet_token: str,
-        sheet_name: str,
-        schema: SheetSchema,
-    ) -> None:
-        schema_key = CacheKeys.sheet_schema_key(spreadsheet_token, sheet_name)
-        schema_dict = {
-            "key_column": schema.key_column,
-            "headers": schema.headers,
-            "header_row": schema.header_row,
-            "data_start_row": schema.data_start_row,
-            "type_mapping": schema.type_mapping,
-            "array_columns": schema.array_columns,
-            "json_columns": schema.json_columns,
-        }
-        await self.redis.set(schema_key, schema_dict)
-
-
-
-    async def _write_table_meta(
+    async def _build_table_meta(
         self,
         table: str,
         schema: SheetSchema,
@@ -219,26 +379,15 @@ class SheetSyncService(BaseService):
         sheet_id: str,
         sheet_title: str,
         table_group: Optional[str] = None,
-    ) -> None:
-        """写入精简 table meta（包含 sources 与 ids_key 软引用）。不再写入 xpj:schema:{table}。"""
-        # 1) 生成 columns（类型映射）
-        def _map_type(t: str) -> str:
-            t_lower = (t or "").strip().lower()
-            # 归一化整数类型
-            if t_lower in {
-                "int", "int32", "int64", "sint32", "sint64",
-                "uint", "uint32", "uint64", "integer", "i32", "i64",
-            }:
-                return "int"
-            # 归一化浮点类型（含 fp32/fp64/decimal/number）
-            if t_lower in {"float", "double", "fp32", "fp64", "number", "decimal"}:
-                return "float"
-            # 其它一律按字符串处理（包括 bool/array/json/bytes 等，在表 meta 层不细分）
-            return "str"
-
-        columns: List[Dict[str, Any]] = []
-        for name in (schema.headers or []):
-            columns.append({"name": name, "type": _map_type(schema.type_mapping.get(name, "str"))})
+    ) -> Dict[str, Any]:
+        """基于已有 meta 合并 sources/group_names，生成 table meta（不写入）。
+
+        需在表级锁内调用：历史 meta 在锁内读取，其他同步对同表的写入不会被旧快照覆盖。
+        """
+        # 1) 生成 columns（类型映射；同一 schema 在轮询周期间重复出现，结果缓存）
+        headers = tuple(schema.headers or ())
+        # 缓存中的 dict 只读共享，此处仅用于序列化
+        columns = list(_build_columns(headers, tuple(schema.type_mapping.get(h, "str") for h in headers)))
 
         # 2) 读取历史 meta 以合并 group names 和 sources
         existing_meta: Dict[str, Any] = {}
@@ -253,28 +402,28 @@ class SheetSyncService(BaseService):
         # table_group 现在总是有值（至少是 "default"）
         old_groups.add(table_group)
 
-        # 3) 合并 sources：避免重复，保留历史来源
+        # 3) 合并 sources：避免重复，保留历史来源（来源键 -> 下标每次按 sources 现算，不随 meta 持久化）
         existing_sources = existing_meta.get("sources", []) or []
-        existing_source_keys = {
-            (s.get("spreadsheet_token"), s.get("sheet_id"), s.get("title"))
-            for s in existing_sources
-        }
+        source_index: Dict[Tuple[Any, ...], int] = {}
+        for i, src in enumerate(existing_sources):
+            try:
+                fields = _SOURCE_FIELDS(src)
+            except KeyError:
+                # 历史数据可能缺字段，按 None 处理
+                fields = (src.get("spreadsheet_token"), src.get("sheet_id"), src.get("title"))
+            source_index[fields] = i
         new_source = {
             "spreadsheet_token": spreadsheet_token,
             "sheet_id": sheet_id,
             "title": sheet_title,
             "table_group": table_group,
         }
-        new_source_key = (spreadsheet_token, sheet_id, sheet_title)
-        
-        if new_source_key not in existing_source_keys:
+        idx = source_index.get((spreadsheet_token, sheet_id, sheet_title))
+        if idx is None:
             existing_sources.append(new_source)
         else:
             # 更新已存在的 source，补充 table_group
-            for s in existing_sources:
-                if (s.get("spreadsheet_token"), s.get("sheet_id"), s.get("title")) == new_source_key:
-                    s["table_group"] = table_group
-                    break
+            existing_sources[idx]["table_group"] = table_group
 
         # 4) 使用 merge 服务的组识别逻辑，兼容多种模式
         merge_group, merge_sub = identify_group_and_sub(sheet_title)
@@ -298,41 +447,24 @@ class SheetSyncService(BaseService):
             "merge_group": merge_group,
             "merge_sub": merge_sub,
         }
-        await self.redis.set(CacheKeys.table_meta_key(table), meta)
-
-
-
-
-    def _col_number_to_letters(self, col_number: int) -> str:
-        """1 -> A, 26 -> Z, 27 -> AA ..."""
-        result = ""
-        n = max(col_number, 1)
-        while n > 0:
-            n, rem = divmod(n - 1, 26)
-            result = chr(65 + rem) + result
-        return result
+        return meta
 
-    def _extract_table_group(self, table_name: str) -> Optional[str]:
+    @staticmethod
+    def _extract_table_group(table_name: str) -> Optional[str]:
         """提取表名中的括号组名，例如: Config_Unit_Basic(Group测试) -> Group测试"""
-        try:
-            name = table_name or ""
-            if "(" in name and name.endswith(")"):
-                start = name.rfind("(")
-                return name[start + 1 : -1] or None
-            return None
-        except Exception:
-            return None
-
-    def _strip_group_from_table_name(self, table_name: str) -> str:
+        name = table_name or ""
+        if name.endswith(")") and "(" in name:
+            start = name.rfind("(")
+            return name[start + 1 : -1] or None
+        return None
+
+    @staticmethod
+    def _strip_group_from_table_name(table_name: str) -> str:
         """去除表名末尾括号部分，得到基础表名。Config_Unit_Basic(Group) -> Config_Unit_Basic"""
-        try:
-            name = table_name or ""
-            if "(" in name and name.endswith(")"):
-                start = name.rfind("(")
-                return name[:start]
-            return name
-        except Exception:
-            return table_name
+        name = table_name or ""
+        if name.endswith(")") and "(" in name:
+            return name[: name.rfind("(")]
+        return name
 
     async def _list_sheets(self, spreadsheet_token: str) -> Dict[str, Any]:
         """列出工作簿内的所有 sheet，返回简化的 dict 结构。
@@ -360,57 +492,29 @@ class SheetSyncService(BaseService):
             except Exception:
                 sheets_obj = []
 
-        def _to_dict(s: Any) -> Dict[str, Any]:
-            if isinstance(s, dict):
-                sheet_id = s.get("sheet_id") or s.get("sheetId") or ""
-                title = s.get("title") or s.get("name") or ""
-                gp = s.get("grid_properties") or {}
-                if not isinstance(gp, dict) and gp is not None:
-                    gp = {
-                        "row_count": getattr(gp, "row_count", 0),
-                        "column_count": getattr(gp, "column_count", 0),
-                    }
-                return {
-                    "sheet_id": sheet_id,
-                    "title": title,
-                    "grid_properties": {
-                        "row_count": int((gp or {}).get("row_count", 0) or 0),
-                        "column_count": int((gp or {}).get("column_count", 0) or 0),
-                    },
-                }
-            else:
-                sheet_id = getattr(s, "sheet_id", "")
-                title = getattr(s, "title", "") or getattr(s, "name", "")
-                gp = getattr(s, "grid_properties", None)
-                row_count = 0
-                col_count = 0
-                if gp is not None:
-                    row_count = getattr(gp, "row_count", 0) or 0
-                    col_count = getattr(gp, "column_count", 0) or 0
-                return {
-                    "sheet_id": sheet_id,
-                    "title": title,
-                    "grid_properties": {
-                        "row_count": int(row_count),
-                        "column_count": int(col_count),
-                    },
-                }
-
-        return {"sheets": [_to_dict(s) for s in (sheets_obj or [])]}
-
-    async def _call_list_sheets(self, spreadsheet_token: str):
-        # 使用 SheetService 内部 feishu_client
-        # list_sheets 为同步方法，外层以 run_in_executor 调用也可；但这里直接复用 SheetService 逻辑更简单。
-        # 由于 SheetService.get_sheet_meta 已经验证可调用，我们直接调用 client 方法并返回原始响应。
-        loop = None
-        try:
-            import asyncio
-            loop = asyncio.get_event_loop()
-        except Exception:
-            loop = None
-        if loop and loop.is_running():
-            return await loop.run_in_executor(None, self.sheet_service.feishu_client.list_sheets, spreadsheet_token)
+        sheets_obj = sheets_obj or []
+        # 同一响应内各 sheet 形态一致：按首项选定取值方式一次，循环内不再逐字段判断 dict/对象
+        if sheets_obj and isinstance(sheets_obj[0], dict):
+            def get(obj: Any, name: str) -> Any:
+                return obj.get(name) if obj is not None else None
         else:
-            return self.sheet_service.feishu_client.list_sheets(spreadsheet_token)
+            def get(obj: Any, name: str) -> Any:
+                return getattr(obj, name, None)
 
+        def _to_dict(s: Any) -> Dict[str, Any]:
+            # 一次取值、一次 int 转换；grid_properties 形态不随外层保证，仍用 _field
+            gp = get(s, "grid_properties")
+            return {
+                "sheet_id": get(s, "sheet_id") or get(s, "sheetId") or "",
+                "title": get(s, "title") or get(s, "name") or "",
+                "grid_properties": {
+                    "row_count": _as_int(_field(gp, "row_count")),
+                    "column_count": _as_int(_field(gp, "column_count")),
+                },
+            }
+
+        return {"sheets": [_to_dict(s) for s in sheets_obj]}
 
+    async def _call_list_sheets(self, spreadsheet_token: str):
+        # 复用 SheetService 的专用线程池执行同步 SDK 调用，返回原始响应
+        return await self.sheet_service.list_sheets(spreadsheet_token)
@@ -1,12 +1,48 @@
 """
 表格 Schema 和配置模型定义
 """
+from collections import namedtuple
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Tuple, Any
+from functools import lru_cache
+from itertools import zip_longest
+from typing import Dict, Optional, List, Sequence, Tuple, Any
 import re
 
+from app.services.a1_notation import A1_RANGE_RE, split_a1
 
-@dataclass
+
+# 表头清理：非字母数字/下划线/中文字符替换为下划线，并折叠连续下划线
+_HEADER_SANITIZE = re.compile(r"[^\w\u4e00-\u9fa5]")
+_MULTI_UNDERSCORE = re.compile(r"_+")
+# proto3 数组类型：repeated<T> 与 T[]
+_REPEATED_RE = re.compile(r"repeated\s*<\s*([\w\d]+)\s*>")
+_BRACKET_ARRAY_RE = re.compile(r"([\w\d]+)\s*\[\s*\]")
+# 样本推断：布尔字面量、整数/浮点字面量，以及 float() 可接受字符串的可能首字符
+_BOOL_LITERALS = frozenset({"true", "false", "1", "0", "yes", "no", "是", "否"})
+_INT_LITERAL_RE = re.compile(r"-?\d+")
+_FLOAT_LITERAL_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_FLOAT_START_CHARS = frozenset("+-.0123456789iInN")
+# proto3 标量类型 -> 基础类型（列类型映射与数组元素类型识别共用；未列出的类型按 str 处理）
+_PROTO3_SCALARS: Dict[str, str] = {
+    **dict.fromkeys(("int32", "int64", "sint32", "sint64", "uint32", "uint64"), "int"),
+    "float": "float",
+    "double": "float",
+    "bool": "bool",
+    "string": "str",
+    "bytes": "bytes",
+}
+
+
+def _sanitize_header(s: str) -> str:
+    """将表头中的非字母数字/下划线/中文字符替换为下划线（SchemaBuilder 与 Transformer 共用）"""
+    return _HEADER_SANITIZE.sub("_", s)
+
+
+# sheet 名称含这些字符时需加单引号
+_A1_QUOTE_CHARS = frozenset(" !()")
+
+
+@dataclass(slots=True)
 class SheetSchema:
     """表格 Schema 定义，描述如何解析表格数据"""
     key_column: str  # 主键列名，如 "ID"
@@ -16,6 +52,7 @@ class SheetSchema:
     type_mapping: Dict[str, str] = field(default_factory=dict)  # 列类型映射 {"ID": "int", "Name": "str"}
     array_columns: List[str] = field(default_factory=list)  # 数组类型的列
     json_columns: List[str] = field(default_factory=list)  # JSON 类型的列
+    array_element_types: Dict[str, str] = field(default_factory=dict)  # 数组列声明的元素类型 {"Tags": "str"}
     
     def get_type_for_column(self, column: str) -> str:
         """获取列的类型，默认为 str"""
@@ -32,7 +69,7 @@ class SheetSchema:
         return True
 
 
-@dataclass
+@dataclass(slots=True)
 class SheetRange:
     """表格范围定义"""
     sheet_id: Optional[str] = None  # Sheet ID（可选）
@@ -64,7 +101,7 @@ class SheetRange:
         # 添加 sheet 名称
         if sheet_name:
             # 如果 sheet 名称包含特殊字符，需要用单引号包裹
-            if any(char in sheet_name for char in [' ', '!', '(', ')']):
+            if not _A1_QUOTE_CHARS.isdisjoint(sheet_name):
                 sheet_name = f"'{sheet_name}'"
             range_str = f"{sheet_name}!{range_str}"
         
@@ -82,14 +119,15 @@ class SheetRange:
             # 去除可能的引号
             sheet_name = sheet_name.strip("'")
         
-        # 解析范围
-        pattern = r'^([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$'
-        match = re.match(pattern, range_part)
+        # 解析范围：常规 ASCII 形式逐字符拆分，其余情况交给正则兜底
+        groups = split_a1(range_part)
+        if groups is None:
+            match = A1_RANGE_RE.match(range_part)
+            if not match:
+                raise ValueError(f"无效的 A1 表示法: {a1_str}")
+            groups = match.groups()
         
-        if not match:
-            raise ValueError(f"无效的 A1 表示法: {a1_str}")
-        
-        start_col, start_row, end_col, end_row = match.groups()
+        start_col, start_row, end_col, end_row = groups
         
         return cls(
             sheet_id=sheet_name,
@@ -111,6 +149,39 @@ class SheetSchemaBuilder:
         self._cfg = settings_table
 
     def infer(self, raw_values: List[List[Any]]) -> Tuple[SheetSchema, List[int]]:
+        """推断 schema；表头区域与行配置相同时复用缓存结果（返回副本，调用方可自由修改）"""
+        cfg = self._cfg
+        layout = _HeaderLayout(
+            cfg.header_name_row, cfg.type_row, cfg.comment_row,
+            cfg.data_start_row, cfg.default_key_column,
+        )
+        last = max(cfg.header_name_row, cfg.type_row, cfg.comment_row)
+        # 单元格连同类型一起作为键（1 / 1.0 / True 相等但解析结果不同）；
+        # 行数只在不足 data_start_row 时影响结果，超出部分截断，使不同数据量的同模板表共用缓存
+        try:
+            region = tuple(tuple(zip(map(type, row), row)) for row in raw_values[:last + 1])
+            schema, kept_indices = _infer_header_region(
+                layout, region, min(len(raw_values), cfg.data_start_row + 1)
+            )
+        except TypeError:
+            # 含不可哈希单元格（如富文本 list/dict），直接解析
+            return self._infer(raw_values, len(raw_values))
+        return (
+            SheetSchema(
+                key_column=schema.key_column,
+                headers=list(schema.headers),
+                header_row=schema.header_row,
+                data_start_row=schema.data_start_row,
+                type_mapping=dict(schema.type_mapping),
+                array_columns=list(schema.array_columns),
+                json_columns=list(schema.json_columns),
+                array_element_types=dict(schema.array_element_types),
+            ),
+            list(kept_indices),
+        )
+
+    def _infer(self, raw_values: Sequence[Sequence[Any]], total_rows: int) -> Tuple[SheetSchema, List[int]]:
+        """按表头区域解析 schema；total_rows 为原始数据总行数（raw_values 可仅含表头区域）"""
         cfg = self._cfg
         header_row = cfg.header_name_row + 1
         data_start_row = cfg.data_start_row + 1
@@ -121,9 +192,10 @@ class SheetSchemaBuilder:
         if raw_values and len(raw_values) > cfg.header_name_row:
             name_row = raw_values[cfg.header_name_row]
             for idx, cell in enumerate(name_row):
-                if self._is_empty(cell):
+                if cell is None:
                     continue
-                h = self._clean(str(cell))
+                # 空白单元格清理后为空串，与非法列名一并在此跳过，无需单独判空
+                h = self._clean(cell if isinstance(cell, str) else str(cell))
                 if not h:
                     continue
                 kept_indices.append(idx)
@@ -134,22 +206,30 @@ class SheetSchemaBuilder:
         type_mapping: Dict[str, str] = {}
         array_columns: List[str] = []
         json_columns: List[str] = []
+        array_element_types: Dict[str, str] = {}
+        # 样本行按列转置后的结果：仅在首次遇到空类型列时计算一次，各列直接取用
+        sample_columns: Optional[List[Tuple[Any, ...]]] = None
+
+        # 类型行短于表头时补齐 None，循环内按原始列索引直接取值（kept_indices 升序，末项即最大索引）
+        if kept_indices and len(types_row) <= kept_indices[-1]:
+            types_row = list(types_row) + [None] * (kept_indices[-1] + 1 - len(types_row))
 
-        for pos, header in enumerate(headers):
-            src_idx = kept_indices[pos] if pos < len(kept_indices) else pos
-            tcell = types_row[src_idx] if src_idx < len(types_row) else None
+        for header, src_idx in zip(headers, kept_indices):
+            tcell = types_row[src_idx]
             base_type, elem_type = self._parse_proto3_type(str(tcell) if tcell is not None else "")
             if base_type == "auto":
                 # 空类型，兜底推断：使用下方样本行，但仅作为最后手段
-                samples: List[Any] = []
-                for r in range(cfg.header_name_row + 1, min(len(raw_values), cfg.comment_row + 1)):
-                    row = raw_values[r]
-                    samples.append(row[src_idx] if src_idx < len(row) else None)
+                if sample_columns is None:
+                    sample_rows = raw_values[cfg.header_name_row + 1:cfg.comment_row + 1]
+                    sample_columns = list(zip_longest(*sample_rows))
+                samples = sample_columns[src_idx] if src_idx < len(sample_columns) else ()
                 base_type = self._infer_from_samples(samples)
 
             type_mapping[header] = base_type
             if base_type == "array":
                 array_columns.append(header)
+                if elem_type:
+                    array_element_types[header] = elem_type
             elif base_type == "json":
                 json_columns.append(header)
 
@@ -163,8 +243,8 @@ class SheetSchemaBuilder:
             else:
                 key_column = headers[0]
 
-        if len(raw_values) <= cfg.data_start_row:
-            data_start_row = max(header_row + 1, len(raw_values))
+        if total_rows <= cfg.data_start_row:
+            data_start_row = max(header_row + 1, total_rows)
 
         schema = SheetSchema(
             key_column=key_column,
@@ -174,74 +254,66 @@ class SheetSchemaBuilder:
             type_mapping=type_mapping,
             array_columns=array_columns,
             json_columns=json_columns,
+            array_element_types=array_element_types,
         )
 
         return schema, kept_indices
 
     # ---------- helpers ----------
-    def _is_empty(self, v: Any) -> bool:
-        if v is None:
-            return True
-        if isinstance(v, str) and v.strip() == "":
-            return True
-        return False
-
     def _clean(self, s: str) -> str:
-        s = s.strip()
-        s = re.sub(r"[^\w\u4e00-\u9fa5]", "_", s)
-        s = re.sub(r"_+", "_", s).strip("_")
+        s = _sanitize_header(s.strip())
+        s = _MULTI_UNDERSCORE.sub("_", s).strip("_")
         return s
 
     def _parse_proto3_type(self, s: str) -> Tuple[str, Optional[str]]:
         t = (s or "").strip().lower()
         if not t:
             return "auto", None
-        import re as _re
-        m = _re.match(r"repeated\s*<\s*([\w\d]+)\s*>", t)
-        if m:
-            return "array", self._map_base(m.group(1))
-        m = _re.match(r"([\w\d]+)\s*\[\s*\]", t)
+        m = _REPEATED_RE.match(t) or _BRACKET_ARRAY_RE.match(t)
         if m:
-            return "array", self._map_base(m.group(1))
+            # 元素类型仅记录 proto3 标量；消息/枚举等未知类型为 None
+            return "array", _PROTO3_SCALARS.get(m.group(1))
         if t.startswith("map<") or t.startswith("message") or t == "json":
             return "json", None
         return self._map_base(t), None
 
     def _map_base(self, b: str) -> str:
-        x = (b or "").lower()
-        if x in {"int32","int64","sint32","sint64","uint32","uint64"}: return "int"
-        if x in {"float","double"}: return "float"
-        if x == "bool": return "bool"
-        if x == "string": return "str"
-        if x == "bytes": return "bytes"
-        return "str"
+        return _PROTO3_SCALARS.get((b or "").lower(), "str")
 
-    def _infer_from_samples(self, samples: List[Any]) -> str:
-        has_json = has_array = has_bool = has_int = has_float = False
+    def _infer_from_samples(self, samples: Sequence[Any]) -> str:
+        has_array = has_bool = has_int = has_float = False
         for v in samples:
-            if v is None or (isinstance(v, str) and v.strip() == ""):
+            if v is None:
                 continue
             s = str(v).strip()
-            if s.startswith("{") and s.endswith("}"):
-                has_json = True; continue
-            if s.startswith("[") and s.endswith("]"):
+            if not s:
+                continue
+            first = s[0]
+            if first == "{" and s[-1] == "}":
+                # json 优先级最高，可直接返回
+                return "json"
+            if first == "[" and s[-1] == "]":
                 has_array = True; continue
             if "," in s or ";" in s:
                 has_array = True
-            lv = s.lower()
-            if lv in ("true","false","1","0","yes","no","是","否"):
+            if s.lower() in _BOOL_LITERALS:
                 has_bool = True; continue
-            try:
-                iv = int(float(s)); fv = float(s)
-                if float(iv) == fv: has_int = True
-                else: has_float = True
-                continue
-            except Exception:
+            # 数值判断：常见形式走正则，不触发异常；仅可能被 float() 接受的其他形式（inf/nan/下划线等）再兜底
+            if _INT_LITERAL_RE.fullmatch(s):
+                has_int = True; continue
+            if _FLOAT_LITERAL_RE.fullmatch(s):
+                fv = float(s)
+            elif first in _FLOAT_START_CHARS:
                 try:
-                    float(s); has_float = True; continue
-                except Exception:
-                    pass
-        if has_json: return "json"
+                    fv = float(s)
+                except ValueError:
+                    continue
+            else:
+                continue
+            if fv.is_integer():
+                has_int = True
+            else:
+                has_float = True
         if has_array: return "array"
         if has_bool: return "bool"
         if has_int: return "int"
@@ -249,7 +321,26 @@ class SheetSchemaBuilder:
         return "str"
 
 
-@dataclass
+# 影响 schema 推断的行配置（settings.table 的可哈希快照）
+_HeaderLayout = namedtuple(
+    "_HeaderLayout",
+    "header_name_row type_row comment_row data_start_row default_key_column",
+)
+
+
+@lru_cache(maxsize=256)
+def _infer_header_region(
+    layout: _HeaderLayout,
+    region: Tuple[Tuple[Tuple[type, Any], ...], ...],
+    total_rows: int,
+) -> Tuple[SheetSchema, Tuple[int, ...]]:
+    """按表头区域缓存推断结果；region 为 (类型, 值) 形式的表头行。结果只读共享，由 infer 复制后返回"""
+    rows = [[value for _, value in row] for row in region]
+    schema, kept_indices = SheetSchemaBuilder(layout)._infer(rows, total_rows)
+    return schema, tuple(kept_indices)
+
+
+@dataclass(slots=True)
 class SheetConfig:
     """表格配置，包含获取和解析表格所需的所有信息"""
     sheet_token: str  # 表格 token
@@ -1,11 +1,45 @@
 """
 数据转换器 - 将飞书二维数组转换为结构化 JSON
 """
-from typing import Dict, List, Any
+from functools import partial
+from typing import AbstractSet, Callable, Dict, Iterator, List, Any, Optional, Tuple
 import json
-import re
 from app.services.base import BaseService
-from .schema import SheetSchema
+from .schema import SheetSchema, _sanitize_header
+
+
+# 列解析方式：schema.array_columns / json_columns 中的列（区别于类型映射中的 array/json）
+_ARRAY_COLUMN = "__array_column__"
+_JSON_COLUMN = "__json_column__"
+# 声明为字符串元素的数组列（repeated<string> / string[]）：元素不做数字转换
+_STRING_ARRAY_COLUMN = "__string_array_column__"
+# json.loads 可接受的值的首字符（对象/数组/字符串/数字/true/false/null/NaN/Infinity）
+_JSON_START_CHARS = frozenset('{["-0123456789tfnNI')
+# 布尔列的真/假字面量（小写比较）
+_TRUE_LITERALS = frozenset(("true", "1", "yes", "是"))
+_FALSE_LITERALS = frozenset(("false", "0", "no", "否"))
+# 数组/对象 JSON 的首字符
+_JSON_CONTAINER_STARTS = frozenset("[{")
+# 有专门转换逻辑的列解析方式；其余类型一律按字符串处理
+_TYPED_KINDS = frozenset({
+    _ARRAY_COLUMN, _STRING_ARRAY_COLUMN, _JSON_COLUMN, "int", "float", "bool", "json", "array",
+})
+
+
+def _to_int(text: str) -> int:
+    """整数列取值：纯整数字面量直接 int()（一次解析，且保留超过 2^53 的精度），其余如 "1.0"/"1e3" 经 float 转换"""
+    if text.isdecimal() or (text[0] in "+-" and text[1:].isdecimal()):
+        return int(text)
+    return int(float(text))
+
+
+def _cell_text(value: Any) -> Optional[str]:
+    """单元格转为去首尾空白的字符串；空值（None 或空白字符串）返回 None"""
+    if isinstance(value, str):
+        return value.strip() or None
+    if value is None:
+        return None
+    return str(value).strip()
 
 
 class SheetTransformer(BaseService):
@@ -41,6 +75,26 @@ class SheetTransformer(BaseService):
             self.log_warning("数据为空")
             return {}
         
+        headers, key_index = self._resolve_layout(raw_values, schema)
+        
+        # 转换数据（同一主键后出现的行覆盖之前的行）
+        result = {}
+        for key_value, row_data in self._iter_rows(raw_values, schema, headers, key_index):
+            if key_value in result:
+                self.log_warning(f"发现重复的主键: {key_value}，将覆盖之前的数据")
+            result[key_value] = row_data
+        
+        self.log_info(f"转换完成，共 {len(result)} 条数据")
+        self.record_metric("rows_transformed", len(result))
+        
+        return result
+    
+    def _resolve_layout(
+        self,
+        raw_values: List[List[Any]],
+        schema: SheetSchema
+    ) -> Tuple[List[str], int]:
+        """确定表头与主键列索引"""
         # 提取或使用提供的表头
         if schema.headers:
             headers = schema.headers
@@ -53,44 +107,48 @@ class SheetTransformer(BaseService):
         key_index = self._find_key_column_index(headers, schema.key_column)
         if key_index == -1:
             raise ValueError(f"未找到主键列: {schema.key_column}")
-        
-        # 转换数据
-        result = {}
+        return headers, key_index
+    
+    def _iter_rows(
+        self,
+        raw_values: List[List[Any]],
+        schema: SheetSchema,
+        headers: List[str],
+        key_index: int
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """逐行产出 (主键, 行数据)：跳过空行与缺少主键的行"""
+        # 每列的解析函数只生成一次（避免逐单元格在 array/json 列表中线性查找与类型分派）
+        parsers = self._build_column_parsers(headers, schema)
+        n_cols = len(parsers)
+        is_empty = self._is_empty_value
         data_start = schema.data_start_row - 1  # 转换为 0-based 索引
         
         for row_idx, row in enumerate(raw_values[data_start:], start=data_start):
-            # 跳过空行
-            if not row or all(self._is_empty_value(cell) for cell in row):
-                continue
-            
-            # 获取主键值
-            if key_index >= len(row):
-                self.log_warning(f"行 {row_idx + 1} 缺少主键列")
-                continue
+            row_len = len(row)
+            key_cell = row[key_index] if key_index < row_len else None
+            if key_cell.__class__ is str and key_cell.strip():
+                # 常见情况：主键为非空字符串，该行必然非空，无需逐格扫描
+                key_value = key_cell
+            else:
+                # 跳过空行
+                if not row or all(is_empty(cell) for cell in row):
+                    continue
                 
-            key_value = str(row[key_index])
-            if self._is_empty_value(key_value):
-                self.log_warning(f"行 {row_idx + 1} 主键为空，跳过")
-                continue
+                # 获取主键值
+                if key_index >= row_len:
+                    self.log_warning(f"行 {row_idx + 1} 缺少主键列")
+                    continue
+                    
+                key_value = str(key_cell)
+                if is_empty(key_value):
+                    self.log_warning(f"行 {row_idx + 1} 主键为空，跳过")
+                    continue
             
             # 构建行数据
-            row_data = {}
-            for col_idx, header in enumerate(headers):
-                if col_idx < len(row):
-                    value = self.parse_value(row[col_idx], header, schema)
-                else:
-                    value = None
-                row_data[header] = value
-            
-            # 添加到结果
-            if key_value in result:
-                self.log_warning(f"发现重复的主键: {key_value}，将覆盖之前的数据")
-            result[key_value] = row_data
-        
-        self.log_info(f"转换完成，共 {len(result)} 条数据")
-        self.record_metric("rows_transformed", len(result))
-        
-        return result
+            # 短行补齐 None（各列解析函数对 None 均返回 None），之后统一按 zip 逐列解析，无需逐列比较下标
+            if row_len < n_cols:
+                row = list(row) + [None] * (n_cols - row_len)
+            yield key_value, {header: parse(value) for (header, parse), value in zip(parsers, row)}
     
     def parse_value(
         self,
@@ -109,27 +167,79 @@ class SheetTransformer(BaseService):
         Returns:
             转换后的值
         """
-        # 处理空值
-        if self._is_empty_value(value):
+        return self._parse_by_kind(value, self._column_kind(column, schema), column)
+    
+    @staticmethod
+    def _column_kind(
+        column: str,
+        schema: SheetSchema,
+        array_columns: Optional[AbstractSet[str]] = None,
+        json_columns: Optional[AbstractSet[str]] = None,
+    ) -> str:
+        """确定列的解析方式：数组列/JSON 列优先，其余按类型映射。
+
+        逐列批量判断时可传入预先构建的 array/json 列集合，避免在 schema 列表中线性查找。
+        """
+        if column in (schema.array_columns if array_columns is None else array_columns):
+            if schema.array_element_types.get(column) == "str":
+                return _STRING_ARRAY_COLUMN
+            return _ARRAY_COLUMN
+        if column in (schema.json_columns if json_columns is None else json_columns):
+            return _JSON_COLUMN
+        return schema.get_type_for_column(column)
+    
+    def _build_column_parsers(
+        self,
+        headers: List[str],
+        schema: SheetSchema
+    ) -> List[Tuple[str, Callable[[Any], Any]]]:
+        """为每列生成 (列名, 解析函数)：字符串与整数列使用专用实现，其余委托 _parse_by_kind"""
+        parsers: List[Tuple[str, Callable[[Any], Any]]] = []
+        array_columns = frozenset(schema.array_columns)
+        json_columns = frozenset(schema.json_columns)
+        for header in headers:
+            kind = self._column_kind(header, schema, array_columns, json_columns)
+            if kind not in _TYPED_KINDS:
+                parse = _cell_text
+            elif kind == "int":
+                parse = partial(self._parse_int_cell, column=header)
+            else:
+                parse = partial(self._parse_by_kind, col_type=kind, column=header)
+            parsers.append((header, parse))
+        return parsers
+    
+    def _parse_int_cell(self, value: Any, column: str) -> Any:
+        """整数列的专用解析，与 _parse_by_kind 的 int 分支一致"""
+        str_value = _cell_text(value)
+        if str_value is None:
+            return None
+        try:
+            return _to_int(str_value)
+        except Exception as e:
+            self.log_warning(f"值转换失败 {column}={value}: {e}")
+            return str_value
+    
+    def _parse_by_kind(self, value: Any, col_type: str, column: str) -> Any:
+        """按已确定的列解析方式转换单个值"""
+        # 处理空值，并转换为字符串进行处理
+        str_value = _cell_text(value)
+        if str_value is None:
             return None
-        
-        # 转换为字符串进行处理
-        str_value = str(value).strip()
         
         # 优先检查是否是特殊列类型
-        if column in schema.array_columns:
+        if col_type == _ARRAY_COLUMN:
             return self._parse_array_value(str_value)
         
-        if column in schema.json_columns:
-            return self._parse_json_value(str_value)
+        if col_type == _STRING_ARRAY_COLUMN:
+            return self._parse_array_value(str_value, numeric=False)
         
-        # 获取列的类型
-        col_type = schema.get_type_for_column(column)
+        if col_type == _JSON_COLUMN:
+            return self._parse_json_value(str_value)
         
         try:
             if col_type == "int":
                 # 整数类型
-                return int(float(str_value))
+                return _to_int(str_value)
             
             elif col_type == "float":
                 # 浮点数类型
@@ -138,9 +248,9 @@ class SheetTransformer(BaseService):
             elif col_type == "bool":
                 # 布尔类型
                 lower_val = str_value.lower()
-                if lower_val in ("true", "1", "yes", "是"):
+                if lower_val in _TRUE_LITERALS:
                     return True
-                elif lower_val in ("false", "0", "no", "否"):
+                elif lower_val in _FALSE_LITERALS:
                     return False
                 else:
                     return bool(str_value)
@@ -148,7 +258,7 @@ class SheetTransformer(BaseService):
             elif col_type == "json" or col_type == "array":
                 # JSON 类型（包括数组）
                 # 处理类似 [1, 2, 3] 或 {"a": 1} 的字符串
-                if str_value.startswith("[") or str_value.startswith("{"):
+                if str_value[0] in _JSON_CONTAINER_STARTS:
                     try:
                         return json.loads(str_value)
                     except json.JSONDecodeError:
@@ -194,7 +304,7 @@ class SheetTransformer(BaseService):
                 # 清理表头名称
                 header = str(cell).strip()
                 # 移除特殊字符
-                header = re.sub(r'[^\w\u4e00-\u9fa5]', '_', header)
+                header = _sanitize_header(header)
                 headers.append(header)
         
         return headers
@@ -223,13 +333,13 @@ class SheetTransformer(BaseService):
             return value.strip() == ""
         return False
     
-    def _parse_array_value(self, value: str) -> List[Any]:
-        """解析数组值"""
+    def _parse_array_value(self, value: str, numeric: bool = True) -> List[Any]:
+        """解析数组值；numeric=False 时逗号分隔的元素保持字符串（声明为字符串元素的列）"""
         if not value:
             return []
             
         # 尝试 JSON 数组解析
-        if value.startswith("["):
+        if value[0] == "[":
             try:
                 result = json.loads(value)
                 if isinstance(result, list):
@@ -240,6 +350,8 @@ class SheetTransformer(BaseService):
         # 尝试逗号分隔
         if "," in value:
             items = [item.strip() for item in value.split(",")]
+            if not numeric:
+                return items
             # 尝试转换为数字数组
             try:
                 return [int(item) for item in items if item]
@@ -261,23 +373,28 @@ class SheetTransformer(BaseService):
         if not value:
             return None
             
-        try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            self.log_warning(f"JSON 解析失败: {value}")
-            # 如果是类似键值对的格式，尝试简单解析
-            if ":" in value and not value.startswith("http"):
-                # 简单的键值对解析
-                try:
-                    pairs = {}
-                    for pair in value.split(","):
-                        if ":" in pair:
-                            k, v = pair.split(":", 1)
-                            pairs[k.strip()] = v.strip()
-                    return pairs if pairs else value
-                except:
-                    pass
-            return value
+        # 首字符不可能开始一个 JSON 值（含 json 模块接受的 NaN/Infinity）时不调用解析器，
+        # 直接走失败处理，省去异常的构造与捕获
+        if value[0] in _JSON_START_CHARS:
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        
+        self.log_warning(f"JSON 解析失败: {value}")
+        # 如果是类似键值对的格式，尝试简单解析
+        if ":" in value and not value.startswith("http"):
+            # 简单的键值对解析
+            try:
+                pairs = {}
+                for pair in value.split(","):
+                    if ":" in pair:
+                        k, v = pair.split(":", 1)
+                        pairs[k.strip()] = v.strip()
+                return pairs if pairs else value
+            except:
+                pass
+        return value
     
     def transform_batch(
         self,
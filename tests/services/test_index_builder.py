@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.cache import RedisService, CacheKeys
+from app.services.index_builder import IndexBuilder, TGROUP_STATE_FIELD
+
+
+TABLE = "Config_Unit"
+
+
+def _make_builder():
+    rs = RedisService("redis://fake")
+    rs.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return IndexBuilder(rs), rs
+
+
+def _gids(client, value):
+    return client.zrange(CacheKeys.table_group_ids_key(TABLE, "Subtype", value), 0, -1)
+
+
+async def _gcount(client):
+    counts = await client.hgetall(CacheKeys.table_group_count_key(TABLE, "Subtype"))
+    # 计数归零的字段保留为 "0"，只比较非零项
+    return {k: int(v) for k, v in counts.items() if int(v) != 0}
+
+
+def test_upsert_rows_counts_groups():
+    builder, rs = _make_builder()
+    rows = [
+        (1, {"Name": "a", "Subtype": "hero"}),
+        ("2", {"Name": "b", "Subtype": "hero"}),
+        (3, {"Name": "c", "Subtype": "soldier"}),
+        (4, {"Name": "d", "Subtype": " "}),
+        ("x", {"Name": "bad", "Subtype": "hero"}),
+    ]
+
+    async def run():
+        written = await builder.upsert_rows(TABLE, rows, group_fields=["Subtype"])
+        client = rs.redis_client
+        return (
+            written,
+            await client.zrange(CacheKeys.table_ids_key(TABLE), 0, -1),
+            await _gids(client, "hero"),
+            await _gcount(client),
+            await client.hgetall(CacheKeys.table_row_group_state_key(TABLE, 4)),
+            await rs.get(CacheKeys.row_cfgid_key("1")),
+        )
+
+    written, ids, hero, gcount, state4, row1 = asyncio.run(run())
+    assert written == 4
+    assert ids == ["1", "2", "3", "4"]
+    assert hero == ["1", "2"]
+    assert gcount == {"hero": 2, "soldier": 1}
+    assert state4 == {TGROUP_STATE_FIELD: "default"}
+    assert row1 == {"Name": "a", "Subtype": "hero", "_table": TABLE, "_group": "default"}
+
+
+def test_row_moves_between_groups():
+    builder, rs = _make_builder()
+
+    async def run():
+        await builder.upsert_rows(TABLE, [(1, {"Subtype": "hero"}), (2, {"Subtype": "hero"})])
+        # 重复写入相同分组不应重复计数
+        await builder.upsert_rows(TABLE, [(1, {"Subtype": "hero"}), (2, {"Subtype": "hero"})])
+        await builder.upsert_rows(TABLE, [(1, {"Subtype": "soldier"}), (2, {"Subtype": ""})])
+        client = rs.redis_client
+        return (
+            await _gids(client, "hero"),
+            await _gids(client, "soldier"),
+            await _gcount(client),
+            await client.hgetall(CacheKeys.table_row_group_state_key(TABLE, 1)),
+            await client.hgetall(CacheKeys.table_row_group_state_key(TABLE, 2)),
+        )
+
+    hero, soldier, gcount, state1, state2 = asyncio.run(run())
+    assert hero == []
+    assert soldier == ["1"]
+    assert gcount == {"soldier": 1}
+    assert state1 == {"Subtype": "soldier", TGROUP_STATE_FIELD: "default"}
+    assert state2 == {TGROUP_STATE_FIELD: "default"}
+
+
+def test_row_moves_between_table_groups():
+    # 表级组名记录在 gstate 中并被读回：行换组后须从旧的表级分组中移除
+    builder, rs = _make_builder()
+
+    async def run():
+        await builder.upsert_row(TABLE, 1, {"Subtype": "hero"}, table_group="hero")
+        await builder.upsert_rows(TABLE, [(1, {"Subtype": "hero"}), (2, {"Subtype": "mob"})], table_group="mob")
+        client = rs.redis_client
+        return (
+            await client.zrange(CacheKeys.table_tgroup_ids_key(TABLE, "hero"), 0, -1),
+            await client.zrange(CacheKeys.table_tgroup_ids_key(TABLE, "mob"), 0, -1),
+            await rs.get(CacheKeys.row_cfgid_key("1")),
+        )
+
+    hero, mob, row1 = asyncio.run(run())
+    assert hero == []
+    assert mob == ["1", "2"]
+    assert row1["_group"] == "mob"
+
+
+def test_duplicate_ids_in_batch_keep_last_row():
+    builder, rs = _make_builder()
+    rows = [
+        (1, {"Name": "first", "Subtype": "hero"}),
+        (2, {"Name": "other", "Subtype": "hero"}),
+        ("1", {"Name": "last", "Subtype": "soldier"}),
+    ]
+
+    async def run():
+        written = await builder.upsert_rows(TABLE, rows)
+        client = rs.redis_client
+        return (
+            written,
+            await client.zrange(CacheKeys.table_ids_key(TABLE), 0, -1),
+            await _gids(client, "hero"),
+            await _gids(client, "soldier"),
+            await _gcount(client),
+            await rs.get(CacheKeys.row_cfgid_key("1")),
+        )
+
+    written, ids, hero, soldier, gcount, row1 = asyncio.run(run())
+    assert written == 2
+    assert ids == ["1", "2"]
+    assert hero == ["2"]
+    assert soldier == ["1"]
+    assert gcount == {"hero": 1, "soldier": 1}
+    assert row1["Name"] == "last"
+
+
+def test_extra_sets_written_with_rows():
+    builder, rs = _make_builder()
+    meta_key = CacheKeys.table_meta_key(TABLE)
+
+    async def run():
+        await builder.upsert_rows(TABLE, [(1, {"Subtype": "hero"})], extra_sets={meta_key: {"table": TABLE}})
+        # 无有效行时 extra_sets 仍需写入
+        await builder.upsert_rows("Other", [("x", {})], extra_sets={"k": [1]})
+        return await rs.get(meta_key), await rs.get("k")
+
+    assert asyncio.run(run()) == ({"table": TABLE}, [1])
+
+
+def test_group_state_used_when_ids_index_missing():
+    # ids 索引被重建（先删后写）或手工删除时 gstate 仍在，须据此迁移分组而非视作新行
+    builder, rs = _make_builder()
+
+    async def run():
+        await builder.upsert_rows(TABLE, [(1, {"Subtype": "hero"}), (2, {"Subtype": "hero"})])
+        await rs.redis_client.delete(CacheKeys.table_ids_key(TABLE))
+        # 新实例（如进程重启后）同样须读回 gstate
+        await IndexBuilder(rs).upsert_rows(TABLE, [(1, {"Subtype": "soldier"}), (2, {"Subtype": "hero"})])
+        client = rs.redis_client
+        return await _gids(client, "hero"), await _gids(client, "soldier"), await _gcount(client)
+
+    hero, soldier, gcount = asyncio.run(run())
+    assert hero == ["2"]
+    assert soldier == ["1"]
+    assert gcount == {"hero": 1, "soldier": 1}
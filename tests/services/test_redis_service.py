@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.cache import RedisService
+
+
+def _make_service():
+    rs = RedisService("redis://fake")
+    rs.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return rs
+
+
+def test_set_get_roundtrip():
+    rs = _make_service()
+
+    async def run():
+        await rs.set("k", {"id": 1, "name": "中文", "tags": [1, 2]})
+        return await rs.get("k")
+
+    assert asyncio.run(run()) == {"id": 1, "name": "中文", "tags": [1, 2]}
+
+
+def test_int_wider_than_64_bits_roundtrip():
+    # 超长 ID 单元格解析为 int 后超出 orjson 支持范围，需回退且读回精度不丢失
+    rs = _make_service()
+    big = 123456789012345678901234
+    value = {"ID": big, "Name": "x", "Nested": {"n": -big}}
+
+    async def run():
+        await rs.set("single", value)
+        await rs.mset({"a": value, "b": {"ID": 1}})
+        await rs.mset({"c": value}, ttl=60)
+        return await rs.get("single"), await rs.mget(["a", "b", "c"])
+
+    single, many = asyncio.run(run())
+    assert single == value
+    assert type(single["ID"]) is int
+    assert many == [value, {"ID": 1}, value]
+
+
+def test_corrupted_value_is_dropped():
+    rs = _make_service()
+
+    async def run():
+        await rs.redis_client.set("bad", "{not json")
+        await rs.redis_client.set("bad_long", "{12345678901234567890123")
+        got = await rs.get("bad"), await rs.mget(["bad_long"])
+        return got, await rs.exists("bad"), await rs.exists("bad_long")
+
+    (single, many), exists_bad, exists_long = asyncio.run(run())
+    assert single is None and many == [None]
+    assert not exists_bad and not exists_long
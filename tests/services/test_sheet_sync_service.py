@@ -0,0 +1,224 @@
+import asyncio
+import gc
+import re
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.core.config import settings
+from app.services.cache import RedisService, CacheKeys
+from app.services.sheet_sync_service import SheetSyncService
+from app.services.transform import SheetTransformer
+
+
+# 默认表头布局：索引行、列名行、类型行、备注行，第 5 行起为数据
+HEADER = [
+    ["idx", "idx", "idx"],
+    ["ID", "Name", "Subtype"],
+    ["int", "string", "string"],
+    ["id", "name", "sub"],
+]
+
+
+def _sheet(sheet_id, title, rows, cols=3):
+    return {
+        "sheet_id": sheet_id,
+        "title": title,
+        "grid_properties": {"row_count": rows, "column_count": cols},
+    }
+
+
+class _FakeSheetService:
+    """按 A1 范围切片返回预置数据；delays 可让指定 sheet 的读取变慢"""
+
+    def __init__(self, data, delays=None):
+        self.data = data
+        self.delays = delays or {}
+
+    async def get_sheet_values(self, spreadsheet_token, range_str):
+        m = re.match(r"(\w+)!A(\d+):[A-Z]+(\d+)", range_str)
+        sheet_id, start, end = m.group(1), int(m.group(2)), int(m.group(3))
+        await asyncio.sleep(self.delays.get(sheet_id, 0))
+        return {"valueRange": {"values": [list(r) for r in self.data[sheet_id][start - 1:end]]}}
+
+
+def _make_service(data, sheets, delays=None, redis_client=None):
+    rs = RedisService("redis://fake")
+    rs.redis_client = redis_client or fakeredis.FakeAsyncRedis(decode_responses=True)
+    svc = SheetSyncService(_FakeSheetService(data, delays), rs, SheetTransformer())
+
+    async def list_sheets(spreadsheet_token):
+        return {"sheets": sheets}
+
+    svc._list_sheets = list_sheets
+    return svc, rs
+
+
+async def _dump(client):
+    dump = {}
+    for key in sorted(await client.keys("*")):
+        kind = await client.type(key)
+        if kind == "string":
+            dump[key] = await client.get(key)
+        elif kind == "hash":
+            dump[key] = await client.hgetall(key)
+        elif kind == "zset":
+            dump[key] = await client.zrange(key, 0, -1, withscores=True)
+        else:
+            dump[key] = sorted(await client.smembers(key))
+    return dump
+
+
+def test_same_table_sheets_follow_workbook_order():
+    # 同表两个 sheet：先出现的读取更慢，结果仍须与按工作簿顺序依次同步一致
+    data = {
+        "s1": HEADER + [[1, "hero-1", "hero"], [2, "hero-2", "hero"]],
+        "s2": HEADER + [[2, "mob-2", "mob"], [3, "mob-3", "mob"]],
+        "s3": HEADER + [[10, "item", "misc"]],
+    }
+    sheets = [
+        _sheet("s1", "Config_Unit(hero)", 6),
+        _sheet("s2", "Config_Unit(mob)", 6),
+        _sheet("s3", "Config_Item", 5),
+    ]
+    svc, rs = _make_service(data, sheets, delays={"s1": 0.05})
+
+    async def run():
+        result = await svc.sync_sheet("tok")
+        meta = await rs.get(CacheKeys.table_meta_key("Config_Unit"))
+        row = await rs.get(CacheKeys.row_cfgid_key("2"))
+        return result, meta, row
+
+    result, meta, row = asyncio.run(run())
+    assert [r["sheet_id"] for r in result["sheets"]] == ["s1", "s2", "s3"]
+    assert result["total_rows_written"] == 5
+    assert meta["table_group"] == "mob"
+    assert [s["title"] for s in meta["sources"]] == ["Config_Unit(hero)", "Config_Unit(mob)"]
+    assert row["Name"] == "mob-2"
+
+
+def test_table_meta_is_reread_on_every_sync():
+    # 外部对 table meta 的修改（另一进程写入或手工编辑）须在下一次同步时被合并，而非被进程内旧副本覆盖
+    data = {"s1": HEADER + [[1, "a", "hero"]]}
+    sheets = [_sheet("s1", "Config_Unit(hero)", 5)]
+    svc, rs = _make_service(data, sheets)
+    meta_key = CacheKeys.table_meta_key("Config_Unit")
+    external = {"spreadsheet_token": "other", "sheet_id": "x", "title": "Config_Unit(mob)", "table_group": "mob"}
+
+    async def run():
+        await svc.sync_sheet("tok")
+        meta = await rs.get(meta_key)
+        meta["sources"].append(external)
+        meta["group_names"].append("mob")
+        await rs.set(meta_key, meta)
+        await svc.sync_sheet("tok")
+        return await rs.get(meta_key)
+
+    meta = asyncio.run(run())
+    assert [s["title"] for s in meta["sources"]] == ["Config_Unit(hero)", "Config_Unit(mob)"]
+    assert meta["group_names"] == ["hero", "mob"]
+
+
+def test_chunked_read_matches_single_read(monkeypatch):
+    # 分块读取（每块 10 行）与一次读取整表，写入 Redis 的内容须完全一致
+    data = {
+        "s1": HEADER
+        + [[i, f"n{i}", "hero" if i % 3 else "soldier"] for i in range(1, 58)]
+        + [[58, "short"], ["bad", "skip", "hero"], [59, None, ""]]
+        + [[None, None, None]] * 7,
+        "s2": HEADER + [[i, f"m{i}", "mob"] for i in range(50, 75)],
+    }
+    sheets = [
+        _sheet("s1", "Config_Unit(hero)", len(data["s1"])),
+        _sheet("s2", "Config_Unit(mob)", len(data["s2"])),
+    ]
+    reads = []
+
+    async def run(read_rows):
+        monkeypatch.setattr(settings.feishu, "sheet_read_rows", read_rows)
+        svc, rs = _make_service(data, sheets)
+        get_values = svc.sheet_service.get_sheet_values
+
+        async def counting_get_values(spreadsheet_token, range_str):
+            reads.append(range_str)
+            return await get_values(spreadsheet_token, range_str)
+
+        svc.sheet_service.get_sheet_values = counting_get_values
+        result = await svc.sync_sheet("tok")
+        return result, await _dump(rs.redis_client)
+
+    full_result, full_dump = asyncio.run(run(5000))
+    assert len(reads) == 2
+    reads.clear()
+    chunked_result, chunked_dump = asyncio.run(run(10))
+    assert len(reads) > 2
+
+    assert chunked_dump == full_dump
+    assert chunked_result == full_result
+    assert full_result["total_rows_written"] == 59 + 25
+
+
+def test_concurrent_syncs_merge_table_meta():
+    # 两个工作簿同时同步同一 base_table：慢的一方写 meta 时须基于快的一方已写入的 sources 合并
+    data = {
+        "a1": HEADER + [[1, "a", "hero"]],
+        "b1": HEADER + [[2, "b", "mob"]],
+    }
+    workbooks = {
+        "slow": [_sheet("a1", "Config_Unit(hero)", 5)],
+        "fast": [_sheet("b1", "Config_Unit(mob)", 5)],
+    }
+    svc, rs = _make_service(data, [], delays={"a1": 0.05})
+
+    async def list_sheets(spreadsheet_token):
+        return {"sheets": workbooks[spreadsheet_token]}
+
+    svc._list_sheets = list_sheets
+
+    async def run():
+        await asyncio.gather(svc.sync_sheet("slow"), svc.sync_sheet("fast"))
+        return await rs.get(CacheKeys.table_meta_key("Config_Unit"))
+
+    meta = asyncio.run(run())
+    assert [s["title"] for s in meta["sources"]] == ["Config_Unit(mob)", "Config_Unit(hero)"]
+    assert meta["group_names"] == ["hero", "mob"]
+
+
+def test_reordered_sources_merge_by_key():
+    # sources 被外部重排（长度不变）后，合并仍须按来源键定位条目；meta 中不持久化内部下标
+    data = {"s1": HEADER + [[1, "a", "hero"]], "s2": HEADER + [[2, "b", "mob"]]}
+    sheets = [_sheet("s1", "Config_Unit(hero)", 5), _sheet("s2", "Config_Unit(mob)", 5)]
+    svc, rs = _make_service(data, sheets)
+    meta_key = CacheKeys.table_meta_key("Config_Unit")
+
+    async def run():
+        await svc.sync_sheet("tok")
+        meta = await rs.get(meta_key)
+        meta["sources"].reverse()
+        # 旧版本写入的下标（与重排后的 sources 不符）须被忽略
+        meta["_source_index"] = {"stale": 0, "other": 1}
+        await rs.set(meta_key, meta)
+        await svc.sync_sheet("tok")
+        return await rs.get(meta_key)
+
+    meta = asyncio.run(run())
+    assert [(s["title"], s["table_group"]) for s in meta["sources"]] == [
+        ("Config_Unit(mob)", "mob"),
+        ("Config_Unit(hero)", "hero"),
+    ]
+    assert "_source_index" not in meta
+
+
+def test_table_locks_are_released_after_sync():
+    # 表级锁只在同步期间存活，同步结束后不在服务单例中累积
+    data = {"s1": HEADER + [[1, "a", "hero"]], "s2": HEADER + [[10, "item", "misc"]]}
+    sheets = [_sheet("s1", "Config_Unit(hero)", 5), _sheet("s2", "Config_Item", 5)]
+    svc, rs = _make_service(data, sheets)
+
+    async def run():
+        await asyncio.gather(svc.sync_sheet("tok"), svc.sync_sheet("tok"))
+
+    asyncio.run(run())
+    gc.collect()
+    assert len(svc._table_locks) == 0